@@ -0,0 +1,205 @@
+"""
+Benchmarks for main.py.
+
+The season bucketing micro-benchmark times the CPU-bound part of retroactive
+runs. The API scenarios run update_seasonal_playlist and
+create_retroactive_seasonal_playlists against a local fake Spotify API
+(fake_spotify.py) and report wall time, requests made, response bytes sent
+by the API and peak Python memory for each, giving a baseline to compare
+performance changes against.
+
+Run with:
+    python benchmark.py
+    python benchmark.py --sizes 1000,20000,200000 --latency 0.05 --throttle-rate 0.01
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import requests
+import spotipy
+
+import fake_spotify
+import main
+
+def make_tracks(count, first_year, last_year):
+    """Generate synthetic tracks spread evenly between two years, sorted oldest first."""
+    start = datetime(first_year, 1, 1)
+    span = (datetime(last_year, 12, 31) - start).total_seconds()
+    rng = random.Random(count)
+
+    first = main.to_timestamp(start)
+    tracks = []
+    for i in range(count):
+        added_at = first + int(rng.random() * span)
+        tracks.append(main.Track(f"track{i:08d}", f"Track {i}", added_at))
+    tracks.sort(key=main.by_added_at)
+    return tracks
+
+def bucket_by_rescanning(tracks, season_calendar):
+    """The previous approach: rescan every track for every season period."""
+    buckets = []
+    for i in range(len(season_calendar.boundaries) - 1):
+        season_start = season_calendar.period_start(i)
+        season_end = season_calendar.period_end(i)
+        buckets.append([track for track in tracks if season_start <= track.added_at < season_end])
+    return buckets
+
+def best_of(func, *args, repeat=3):
+    """Return the fastest of several timed runs, in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_season_bucketing(first_year=2019, last_year=2025):
+    """Compare single-pass bucketing with rescanning as the track count grows."""
+    season_calendar = main.SeasonCalendar(first_year - 1, last_year + 1)
+    periods = len(season_calendar.boundaries) - 1
+    print(f"Season bucketing ({periods} periods, {first_year}-{last_year})")
+    print(f"{'tracks':>8} {'rescan (ms)':>12} {'single pass (ms)':>17} {'ns/track':>9}")
+
+    for count in (1_000, 10_000, 50_000, 200_000):
+        tracks = make_tracks(count, first_year, last_year)
+        assert bucket_by_rescanning(tracks, season_calendar) == season_calendar.bucket(tracks)
+
+        rescan = best_of(bucket_by_rescanning, tracks, season_calendar)
+        single_pass = best_of(season_calendar.bucket, tracks)
+        print(f"{count:>8} {rescan * 1000:>12.1f} {single_pass * 1000:>17.1f} {single_pass / count * 1e9:>9.0f}")
+
+def serve_fake_api(queue, track_count, years, latency, throttle_rate):
+    """Run the fake API in a child process, so its memory isn't counted against main.py."""
+    api = fake_spotify.FakeSpotify(latency=latency, throttle_rate=throttle_rate)
+    end = datetime.utcnow()
+    api.add_playlist("main", track_count, start=end - timedelta(days=365 * years), end=end,
+                     playlist_id=fake_spotify.MAIN_PLAYLIST_ID)
+    server = fake_spotify.FakeSpotifyServer(api)
+    queue.put(server.url)
+    server.httpd.serve_forever()
+
+def fake_api_client(url):
+    """Create a client for the fake API, wrapped the same way as get_spotify_client."""
+    sp = spotipy.Spotify(auth="fake-token", requests_timeout=30)
+    sp.prefix = f"{url}/v1/"
+    # The fake API has no rate limit of its own, so only 429 injection should slow us down
+    return main.wrap_spotify_client(sp, main.RateLimiter(1000, burst=100))
+
+def request_counts(url):
+    """Return (requests, throttled requests, response bytes) served by the fake API so far."""
+    stats = requests.get(f"{url}/__stats").json()
+    total = sum(entry["calls"] for entry in stats.values())
+    throttled = sum(entry["calls"] for name, entry in stats.items() if name.endswith("(429)"))
+    sent = sum(entry["bytes"] for entry in stats.values())
+    return total, throttled, sent
+
+def run_scenario(url, func, trace_memory=False):
+    """Run one scenario and return (wall time, requests, throttled requests, response bytes, peak memory)."""
+    before, throttled_before, sent_before = request_counts(url)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    after, throttled_after, sent_after = request_counts(url)
+    return elapsed, after - before, throttled_after - throttled_before, sent_after - sent_before, peak
+
+def run_api_scenarios(track_count, years, latency, throttle_rate, trace_memory):
+    """Run every scenario in order against a fresh fake API and return their results."""
+    queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve_fake_api, args=(queue, track_count, years, latency, throttle_rate), daemon=True
+    )
+    server.start()
+    url = queue.get()
+
+    results = {}
+    original_dir = os.getcwd()
+    # Keep the sync state, playlist index and ledger of each run apart
+    with tempfile.TemporaryDirectory() as state_dir:
+        os.chdir(state_dir)
+        try:
+            main.MAIN_PLAYLIST_ID = fake_spotify.MAIN_PLAYLIST_ID
+            main.USER_ID = fake_spotify.USER_ID
+            main._playlist_indexes.clear()
+            sp = fake_api_client(url)
+
+            def run(name, func):
+                results[name] = run_scenario(url, func, trace_memory)
+
+            run("update (cold)", lambda: main.update_seasonal_playlist(sp))
+            run("update (unchanged)", lambda: main.update_seasonal_playlist(sp))
+
+            new_uris = [f"spotify:track:{10**21 + i:022d}" for i in range(50)]
+            sp.playlist_add_items(fake_spotify.MAIN_PLAYLIST_ID, new_uris)
+            run("update (50 new)", lambda: main.update_seasonal_playlist(sp))
+
+            start_year = datetime.now().year - years
+            run("retroactive", lambda: main.create_retroactive_seasonal_playlists(sp, start_year))
+            run("retroactive (rerun)", lambda: main.create_retroactive_seasonal_playlists(sp, start_year))
+
+            # Without the mirror and ledger every playlist is read again, but pages the
+            # HTTP cache has seen before are revalidated instead of downloaded
+            def retroactive_without_local_state():
+                main._playlist_indexes.clear()
+                for path in (main.LEDGER_PATH, main.MIRROR_PATH, main.SYNC_STATE_PATH):
+                    if os.path.exists(path):
+                        os.remove(path)
+                main.create_retroactive_seasonal_playlists(sp, start_year)
+            run("retroactive (no state)", retroactive_without_local_state)
+            run("  ... and again", retroactive_without_local_state)
+        finally:
+            os.chdir(original_dir)
+
+    server.terminate()
+    server.join()
+    return results
+
+def bench_api_scenarios(sizes, years=3, latency=0.02, throttle_rate=0.0):
+    """
+    Run the regular and retroactive flows against the fake API for each playlist size.
+    
+    Each size runs twice: once for wall time and request counts, and once with
+    tracemalloc on for peak memory, since tracing slows everything down a lot.
+    """
+    print(f"API scenarios (fake API, {latency * 1000:.0f} ms latency, {throttle_rate:.0%} throttled)")
+    print(f"{'scenario':<22} {'tracks':>8} {'wall (s)':>9} {'requests':>9} {'throttled':>10} "
+          f"{'recv (KiB)':>10} {'peak (MiB)':>10}")
+
+    for track_count in sizes:
+        timed = run_api_scenarios(track_count, years, latency, throttle_rate, trace_memory=False)
+        traced = run_api_scenarios(track_count, years, latency, throttle_rate, trace_memory=True)
+        for name, (elapsed, request_count, throttled, sent, _) in timed.items():
+            peak = traced[name][4]
+            print(f"{name:<22} {track_count:>8} {elapsed:>9.2f} {request_count:>9} "
+                  f"{throttled:>10} {sent / 2**10:>10.0f} {peak / 2**20:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark main.py")
+    parser.add_argument("--sizes", default="1000,20000", help="Comma-separated main playlist sizes")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds of fake API latency per request")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--skip-api", action="store_true", help="Only run the micro-benchmarks")
+    args = parser.parse_args()
+
+    bench_season_bucketing()
+    if not args.skip_api:
+        print()
+        sizes = [int(size) for size in args.sizes.split(",")]
+        bench_api_scenarios(sizes, latency=args.latency, throttle_rate=args.throttle_rate)
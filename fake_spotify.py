@@ -0,0 +1,302 @@
+"""
+Local stand-in for the parts of the Spotify Web API used by main.py.
+
+Serves playlist metadata and items, the current user's Liked Songs, track
+and artist lookups, the current user's playlists, playlist creation,
+adding, removing and reordering items, and sharing, with optional
+per-request latency and randomly injected 429 responses. GET responses
+carry an ETag and are answered with a bodiless 304 when the request's
+If-None-Match matches. Playlists are generated synthetically, so
+benchmarks can run against anything from a handful to hundreds of
+thousands of tracks without touching the real API.
+
+Run it on its own with:
+    python fake_spotify.py --tracks 20000 --port 8899
+and point a spotipy client at it by setting `sp.prefix = "http://127.0.0.1:8899/v1/"`.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import http.server
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+MAIN_PLAYLIST_ID = "fakemainplaylist"
+USER_ID = "fakeuser"
+
+class FakeSpotify:
+    """In-memory playlists plus the request handling logic of the fake API."""
+
+    def __init__(self, user_id=USER_ID, latency=0.0, throttle_rate=0.0, retry_after=1):
+        self.user_id = user_id
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.base_url = ""
+        self.playlists = {}
+        self.saved = []
+        self.stats = {}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._random = random.Random(0)
+
+    def add_playlist(self, name, track_count=0, start=None, end=None, playlist_id=None, owner=None):
+        """Add a playlist with track_count synthetic tracks added evenly between start and end."""
+        playlist_id = playlist_id or f"fakeplaylist{next(self._ids):010d}"
+        end = end or datetime.utcnow()
+        start = start or end - timedelta(days=365)
+        step = (end - start) / max(track_count, 1)
+
+        items = []
+        for i in range(track_count):
+            added_at = (start + step * i).strftime("%Y-%m-%dT%H:%M:%SZ")
+            items.append((f"{i:022d}", added_at, f"adder{i % 3}"))
+
+        self.playlists[playlist_id] = {
+            "name": name,
+            "owner": owner or self.user_id,
+            "snapshot": 1,
+            "items": items
+        }
+        return playlist_id
+
+    def add_saved_tracks(self, track_count, start=None, end=None, first_id=0):
+        """Like track_count synthetic tracks, numbered from first_id, evenly between start and end."""
+        end = end or datetime.utcnow()
+        start = start or end - timedelta(days=365)
+        step = (end - start) / max(track_count, 1)
+        with self.lock:
+            for i in range(track_count):
+                added_at = (start + step * i).strftime("%Y-%m-%dT%H:%M:%SZ")
+                self.saved.append((f"{first_id + i:022d}", added_at))
+            self.saved.sort(key=lambda item: item[1])
+
+    def count(self, endpoint, size):
+        with self.lock:
+            calls, sent = self.stats.get(endpoint, (0, 0))
+            self.stats[endpoint] = (calls + 1, sent + size)
+
+    def snapshot_id(self, playlist):
+        return f"snapshot{playlist['snapshot']}"
+
+    def track_json(self, track_id):
+        return {
+            "id": track_id,
+            "name": f"Track {int(track_id)}",
+            "uri": f"spotify:track:{track_id}",
+            "duration_ms": 180000 + int(track_id) % 60000,
+            "artists": [{"id": f"{int(track_id) % 500:022d}", "name": f"Artist {int(track_id) % 500}"}]
+        }
+
+    def artist_json(self, artist_id):
+        return {
+            "id": artist_id,
+            "name": f"Artist {int(artist_id)}",
+            "genres": [f"genre {int(artist_id) % 20}", f"genre {int(artist_id) % 7 + 20}"]
+        }
+
+    def item_json(self, item):
+        track_id, added_at, added_by = item
+        return {"added_at": added_at, "added_by": {"id": added_by}, "track": self.track_json(track_id)}
+
+    def page(self, path, items, offset, limit):
+        """Build a paging object with an absolute `next` URL like the real API."""
+        next_url = None
+        if offset + limit < len(items):
+            next_url = f"{self.base_url}{path}?offset={offset + limit}&limit={limit}"
+        return {"items": items[offset:offset + limit], "total": len(items), "offset": offset,
+                "limit": limit, "next": next_url}
+
+    def handle(self, method, path, query, body):
+        """Return (status, headers, payload) for a request."""
+        if self.latency:
+            time.sleep(self.latency)
+        if self.throttle_rate and self._random.random() < self.throttle_rate:
+            return 429, {"Retry-After": str(self.retry_after)}, {"error": {"status": 429, "message": "API rate limit exceeded"}}
+
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["100"])[0])
+
+        if method == "GET" and path == "/v1/me/playlists":
+            playlists = [
+                {"id": playlist_id, "name": playlist["name"], "owner": {"id": playlist["owner"]},
+                 "snapshot_id": self.snapshot_id(playlist), "tracks": {"total": len(playlist["items"])}}
+                for playlist_id, playlist in list(self.playlists.items())
+            ]
+            return 200, {}, self.page(path, playlists, offset, limit)
+
+        if method == "GET" and path == "/v1/me/tracks":
+            # Liked Songs are listed newest first
+            saved = self.saved[::-1]
+            result = self.page(path, saved, offset, limit)
+            result["items"] = [
+                {"added_at": added_at, "track": self.track_json(track_id)}
+                for track_id, added_at in saved[offset:offset + limit]
+            ]
+            return 200, {}, result
+
+        # spotipy asks for these with a trailing slash
+        if method == "GET" and path.rstrip("/") in ("/v1/tracks", "/v1/artists"):
+            ids = query["ids"][0].split(",")
+            if path.startswith("/v1/tracks"):
+                return 200, {}, {"tracks": [self.track_json(track_id) for track_id in ids]}
+            return 200, {}, {"artists": [self.artist_json(artist_id) for artist_id in ids]}
+        
+        match = re.fullmatch(r"/v1/users/([^/]+)/playlists", path)
+        if method == "POST" and match:
+            playlist_id = self.add_playlist(body["name"], owner=match.group(1))
+            return 201, {}, {"id": playlist_id, "name": body["name"], "snapshot_id": "snapshot1"}
+
+        match = re.fullmatch(r"/v1/playlists/([^/]+)(/tracks|/followers)?", path)
+        if not match or match.group(1) not in self.playlists:
+            return 404, {}, {"error": {"status": 404, "message": "Not found"}}
+        playlist = self.playlists[match.group(1)]
+        resource = match.group(2)
+
+        if method == "GET" and resource is None:
+            return 200, {}, {"id": match.group(1), "name": playlist["name"], "owner": {"id": playlist["owner"]},
+                             "snapshot_id": self.snapshot_id(playlist),
+                             "tracks": {"total": len(playlist["items"])}}
+
+        if method == "GET" and resource == "/tracks":
+            items = [self.item_json(item) for item in playlist["items"][offset:offset + limit]]
+            result = self.page(path, playlist["items"], offset, limit)
+            result["items"] = items
+            return 200, {}, result
+
+        if method == "POST" and resource == "/tracks":
+            added_at = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+            new_items = [(uri.split(":")[-1], added_at, self.user_id) for uri in body]
+            with self.lock:
+                if "position" in query:
+                    position = int(query["position"][0])
+                    playlist["items"][position:position] = new_items
+                else:
+                    playlist["items"].extend(new_items)
+                playlist["snapshot"] += 1
+            return 201, {}, {"snapshot_id": self.snapshot_id(playlist)}
+
+        if method == "DELETE" and resource == "/tracks":
+            with self.lock:
+                remove = set()
+                for track in body["tracks"]:
+                    track_id = track["uri"].split(":")[-1]
+                    positions = track.get("positions")
+                    for position, item in enumerate(playlist["items"]):
+                        if item[0] == track_id and (positions is None or position in positions):
+                            remove.add(position)
+                playlist["items"] = [item for position, item in enumerate(playlist["items"]) if position not in remove]
+                playlist["snapshot"] += 1
+            return 200, {}, {"snapshot_id": self.snapshot_id(playlist)}
+        
+        if method == "PUT" and resource == "/tracks":
+            with self.lock:
+                items = playlist["items"]
+                start, length, before = body["range_start"], body.get("range_length", 1), body["insert_before"]
+                block = items[start:start + length]
+                del items[start:start + length]
+                if before > start:
+                    before -= length
+                items[before:before] = block
+                playlist["snapshot"] += 1
+            return 200, {}, {"snapshot_id": self.snapshot_id(playlist)}
+        
+        if method == "PUT" and resource == "/followers":
+            return 200, {}, None
+
+        return 405, {}, {"error": {"status": 405, "message": "Method not allowed"}}
+
+def endpoint_name(method, path):
+    """Collapse IDs out of a path so stats are grouped per endpoint."""
+    path = re.sub(r"/(playlists|users)/[^/]+", r"/\1/{id}", path)
+    return f"{method} {path}"
+
+def make_handler(api):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Send headers and body in one write; split writes stall on delayed ACKs
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def respond(self, status, headers, payload):
+            body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+            if self.command == "GET" and status == 200:
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                headers = {**headers, "ETag": etag}
+                if self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+            return status, len(body)
+
+        def dispatch(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+
+            # Benchmark bookkeeping, not part of the Spotify API
+            if url.path == "/__stats":
+                with api.lock:
+                    stats = {name: {"calls": calls, "bytes": sent} for name, (calls, sent) in api.stats.items()}
+                self.respond(200, {}, stats)
+                return
+
+            status, headers, payload = api.handle(self.command, url.path, parse_qs(url.query), body)
+            status, size = self.respond(status, headers, payload)
+            name = endpoint_name(self.command, url.path)
+            api.count(name if status not in (304, 429) else f"{name} ({status})", size)
+
+        do_GET = do_POST = do_PUT = do_DELETE = dispatch
+
+    return Handler
+
+class FakeSpotifyServer:
+    """Runs a FakeSpotify API on a local port in a background thread."""
+
+    def __init__(self, api, port=0):
+        self.api = api
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", port), make_handler(api))
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        api.base_url = self.url
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Spotify API")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--tracks", type=int, default=1000, help="Tracks in the main playlist")
+    parser.add_argument("--years", type=float, default=2, help="How far back the main playlist goes")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    api = FakeSpotify(latency=args.latency, throttle_rate=args.throttle_rate)
+    end = datetime.utcnow()
+    api.add_playlist("main", args.tracks, start=end - timedelta(days=365 * args.years), end=end,
+                     playlist_id=MAIN_PLAYLIST_ID)
+    server = FakeSpotifyServer(api, args.port)
+    print(f"Fake Spotify API at {server.url}/v1/ (user {api.user_id}, main playlist {MAIN_PLAYLIST_ID})")
+    server.httpd.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,44 @@
-import os
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
-from datetime import datetime, timedelta
 import time
-import http.server
-import socketserver
+
+# Measured from here so the run report can show how long start-up took
+_STARTED_AT = time.perf_counter()
+
+import os
+import re
+import json
+import logging
+import math
+import random
+import calendar
+from datetime import date, datetime, timedelta
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from urllib.parse import urlparse
 import threading
-import dotenv
 
-dotenv.load_dotenv()
+# spotipy, requests, dotenv, sqlite3, http.server and concurrent.futures are
+# imported where they're used, since importing them all up front made up most
+# of the start-up time of short cron runs
+
+def find_env_file():
+    """Find a .env file the way python-dotenv does, walking up from this script's directory."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+# Only pay for importing dotenv when there is a .env file to load
+_env_file = find_env_file()
+if _env_file:
+    import dotenv
+    dotenv.load_dotenv(_env_file)
 
 # Set your Spotify API credentials as environment variables before running:
 # export SPOTIPY_CLIENT_ID='your-spotify-client-id'
@@ -18,8 +48,93 @@ dotenv.load_dotenv()
 # Configuration
 MAIN_PLAYLIST_ID = os.getenv("SPOTIPY_MAIN_PLAYLIST_ID")  # Replace with your actual playlist ID
 USER_ID = os.getenv("SPOTIPY_USER_ID")  # Your Spotify user ID
+
+# Name and description of the seasonal playlists, with {season} and {year} filled in
+PLAYLIST_NAME_TEMPLATE = os.getenv("SPOTIPY_PLAYLIST_NAME_TEMPLATE", "archie + kotoha {season} {year}")
+PLAYLIST_DESCRIPTION_TEMPLATE = os.getenv(
+    "SPOTIPY_PLAYLIST_DESCRIPTION_TEMPLATE", "songs from our playlist during {season} {year}"
+)
 SCOPE = "playlist-read-collaborative playlist-modify-public playlist-modify-private user-library-read"
 
+# Token cache written by spotipy's OAuth flow
+TOKEN_CACHE_PATH = os.getenv("SPOTIPY_TOKEN_CACHE_PATH", ".cache")
+
+# A cached access token valid for at least this many more seconds is used
+# directly for one-shot runs, without setting up the OAuth manager
+TOKEN_MIN_VALIDITY = 300
+
+# File used to remember each playlist's snapshot_id between runs, so unchanged
+# playlists don't have to be downloaded again
+SYNC_STATE_PATH = os.getenv("SPOTIPY_SYNC_STATE_PATH", ".sync_state.json")
+
+# Number of playlist pages fetched in parallel when reading a whole playlist (1 = sequential)
+PAGE_CONCURRENCY = int(os.getenv("SPOTIPY_PAGE_CONCURRENCY", "4"))
+
+# Optional on-disk copy of the user's playlist names, reused for this many seconds (0 disables it)
+PLAYLIST_INDEX_PATH = os.getenv("SPOTIPY_PLAYLIST_INDEX_PATH", ".playlist_index.json")
+PLAYLIST_INDEX_TTL = int(os.getenv("SPOTIPY_PLAYLIST_INDEX_TTL", "0"))
+
+# SQLite ledger of the tracks the bot has confirmed adding to each playlist
+LEDGER_PATH = os.getenv("SPOTIPY_LEDGER_PATH", ".seasonal_ledger.db")
+
+# Source that stands for the account's Liked Songs in a job's sources
+LIKED_SONGS = "liked"
+
+# Comma-separated sources the default job reads besides SPOTIPY_MAIN_PLAYLIST_ID,
+# e.g. "liked" or other playlist IDs
+EXTRA_SOURCES = os.getenv("SPOTIPY_EXTRA_SOURCES", "")
+
+# SQLite copy of the source playlists, so date range queries don't need the API
+MIRROR_PATH = os.getenv("SPOTIPY_MIRROR_PATH", ".playlist_mirror.db")
+
+# SQLite cache of API responses, revalidated with their ETags, of at most this many MiB (0 disables it)
+HTTP_CACHE_PATH = os.getenv("SPOTIPY_HTTP_CACHE_PATH", ".http_cache.db")
+HTTP_CACHE_MB = float(os.getenv("SPOTIPY_HTTP_CACHE_MB", "50"))
+
+# SQLite cache of track and artist metadata for season reports, refreshed after this many seconds
+METADATA_CACHE_PATH = os.getenv("SPOTIPY_METADATA_CACHE_PATH", ".metadata_cache.db")
+METADATA_TTL = int(os.getenv("SPOTIPY_METADATA_TTL", str(30 * 86400)))
+
+# Number of seasonal playlists written at the same time in retroactive mode
+SEASON_WORKERS = int(os.getenv("SPOTIPY_SEASON_WORKERS", "4"))
+
+# Most tracks a retroactive backfill holds waiting to be written before it stops reading
+BACKFILL_BUFFER = int(os.getenv("SPOTIPY_BACKFILL_BUFFER", "5000"))
+
+# Maximum sustained Spotify API requests per second shared by all threads
+RATE_LIMIT = float(os.getenv("SPOTIPY_RATE_LIMIT", "10"))
+
+# How many times a throttled or failed API call is retried before giving up
+MAX_RETRIES = int(os.getenv("SPOTIPY_MAX_RETRIES", "5"))
+
+# Client methods that change playlists; these are only retried on 429, since a
+# 5xx or dropped connection may still have been applied
+WRITE_METHODS = {
+    "playlist_add_items", "playlist_remove_specific_occurrences_of_items", "playlist_reorder_items",
+    "user_playlist_create", "_post", "_put", "_delete"
+}
+
+# Daemon mode polls the main playlist every DAEMON_MIN_INTERVAL seconds after a
+# change, doubling the wait while it stays unchanged up to DAEMON_MAX_INTERVAL
+DAEMON_MIN_INTERVAL = int(os.getenv("SPOTIPY_DAEMON_MIN_INTERVAL", "60"))
+DAEMON_MAX_INTERVAL = int(os.getenv("SPOTIPY_DAEMON_MAX_INTERVAL", "1800"))
+
+# Refresh the access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+
+# Log level for the script's output; DEBUG adds per-track and per-page details
+LOG_LEVEL = os.getenv("SPOTIPY_LOG_LEVEL", "INFO")
+
+# Optional machine-readable reports written at the end of each run: a JSON
+# run report and a Prometheus textfile (for node_exporter's textfile collector)
+RUN_REPORT_PATH = os.getenv("SPOTIPY_RUN_REPORT_PATH")
+PROMETHEUS_TEXTFILE_PATH = os.getenv("SPOTIPY_PROMETHEUS_TEXTFILE")
+
+# Upper bounds, in seconds, of the API latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+logger = logging.getLogger("seasonal_playlist")
+
 # Season definitions with approximate dates (month, day)
 SEASONS = {
     "spring": (3, 20),  # Spring equinox (around March 20)
@@ -28,6 +143,26 @@ SEASONS = {
     "winter": (12, 21)  # Winter solstice (around December 21)
 }
 
+# Where seasons start: "fixed" at midnight on the SEASONS dates, or "astronomical"
+# at the exact equinox and solstice times of each year
+SEASON_BOUNDARIES = os.getenv("SPOTIPY_SEASON_BOUNDARIES", "fixed")
+
+# "north" or "south"; in the southern hemisphere summer starts in December
+SEASON_HEMISPHERE = os.getenv("SPOTIPY_SEASON_HEMISPHERE", "north")
+
+# Time zone whose midnight starts a season on its fixed date, e.g. "Asia/Tokyo"
+SEASON_TIMEZONE = os.getenv("SPOTIPY_SEASON_TIMEZONE", "UTC")
+
+# Period schemes besides seasons, mapping each period's name to the (month, day) it starts on every year
+PERIOD_DATES = {
+    "month": {calendar.month_name[month].lower(): (month, 1) for month in range(1, 13)},
+    "quarter": {"q1": (1, 1), "q2": (4, 1), "q3": (7, 1), "q4": (10, 1)},
+    "term": {"spring term": (1, 8), "summer term": (5, 15), "fall term": (8, 25)}
+}
+
+# Comma-separated period schemes of the default job: "season", "month", "quarter" and/or "term"
+PERIOD_SCHEMES = os.getenv("SPOTIPY_PERIOD_SCHEMES", "season")
+
 # The port your redirect URI is using
 PORT = 8888
 
@@ -72,45 +207,385 @@ SUCCESS_HTML = """
 </html>
 """
 
-class CallbackHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        """Handle GET requests to the server."""
-        # Send a success response
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.end_headers()
-        
-        # Write the success HTML to the response
-        self.wfile.write(SUCCESS_HTML.encode('utf-8'))
-        
-        # If this is the callback URL with a code, signal the server to shut down
-        if self.path.startswith('/callback') and 'code=' in self.path:
-            # Use a thread to shut down the server after sending the response
-            threading.Thread(target=self.server.shutdown).start()
+def make_callback_handler():
+    """Build the callback request handler class, importing http.server only when needed."""
+    import http.server
+    
+    class CallbackHandler(http.server.SimpleHTTPRequestHandler):
+        def do_GET(self):
+            """Handle GET requests to the server."""
+            # Send a success response
+            self.send_response(200)
+            self.send_header('Content-type', 'text/html')
+            self.end_headers()
+            
+            # Write the success HTML to the response
+            self.wfile.write(SUCCESS_HTML.encode('utf-8'))
+            
+            # If this is the callback URL with a code, signal the server to shut down
+            if self.path.startswith('/callback') and 'code=' in self.path:
+                # Use a thread to shut down the server after sending the response
+                threading.Thread(target=self.server.shutdown).start()
+    
+    return CallbackHandler
 
 def start_callback_server():
     """Start the HTTP server to handle the callback."""
-    handler = CallbackHandler
+    import socketserver
+    
+    handler = make_callback_handler()
     
     # Create the server
     with socketserver.TCPServer(("", PORT), handler) as httpd:
-        print(f"Callback server started at http://localhost:{PORT}")
+        logger.info(f"Callback server started at http://localhost:{PORT}")
         # Store the server instance so the handler can shut it down
         handler.server = httpd
         # Serve until shutdown is called from the handler
         httpd.serve_forever()
 
-def get_spotify_client():
-    """Initialize and return a Spotify client with proper authentication."""
+class RunMetrics:
+    """
+    Collects what a run spent its time on, for the run report.
+    
+    Every Spotify API response is recorded per endpoint (call count, bytes,
+    status codes and a latency histogram), retries are counted per client
+    method, and phase() accumulates the time spent in each phase of the run.
+    Phases are entered from worker threads as well, so a phase's time is
+    summed over the threads that ran it and can exceed the run's wall time.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.endpoints = {}
+        self.retries = {}
+        self.phases = {}
+    
+    def record_response(self, response, *args, **kwargs):
+        """requests response hook recording a single API response."""
+        request = response.request
+        # Collapse IDs so e.g. every playlist's items count towards one endpoint
+        path = re.sub(r"/(playlists|users|artists|albums)/[^/]+", r"/\1/{id}", urlparse(request.url).path)
+        endpoint = f"{request.method} {path}"
+        latency = response.elapsed.total_seconds()
+        # Responses revalidated against the ResponseCache arrived as a bodiless 304
+        revalidated = getattr(response, "revalidated", False)
+        
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                "calls": 0,
+                "bytes": 0,
+                "seconds": 0.0,
+                "statuses": {},
+                "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1)
+            })
+            stats["calls"] += 1
+            stats["bytes"] += 0 if revalidated else len(response.content)
+            stats["seconds"] += latency
+            status = "304" if revalidated else str(response.status_code)
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+            stats["latency_buckets"][bisect_left(LATENCY_BUCKETS, latency)] += 1
+    
+    def record_retry(self, method_name):
+        with self.lock:
+            self.retries[method_name] = self.retries.get(method_name, 0) + 1
+    
+    def add_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+    
+    @contextmanager
+    def phase(self, name):
+        """Add the time this thread spends inside the with block to the named phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+    
+    def report(self):
+        """Return the run report as a JSON-serializable dict."""
+        with self.lock:
+            endpoints = {}
+            for endpoint, stats in sorted(self.endpoints.items()):
+                histogram = dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"], stats["latency_buckets"]))
+                endpoints[endpoint] = {
+                    "calls": stats["calls"],
+                    "bytes": stats["bytes"],
+                    "seconds": round(stats["seconds"], 3),
+                    "statuses": dict(stats["statuses"]),
+                    "latency_histogram": histogram
+                }
+            
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+                "api": {
+                    "calls": sum(stats["calls"] for stats in self.endpoints.values()),
+                    "bytes": sum(stats["bytes"] for stats in self.endpoints.values()),
+                    "retries": dict(self.retries),
+                    "endpoints": endpoints
+                }
+            }
+    
+    def write_json(self, path):
+        """Write the run report as JSON."""
+        write_file_atomically(path, json.dumps(self.report(), indent=2))
+    
+    def write_prometheus(self, path):
+        """Write the run report in the Prometheus text exposition format."""
+        report = self.report()
+        lines = [
+            "# HELP seasonal_run_duration_seconds Wall time of the last run.",
+            "# TYPE seasonal_run_duration_seconds gauge",
+            f"seasonal_run_duration_seconds {report['duration_seconds']}",
+            "# HELP seasonal_last_run_timestamp_seconds When the last run finished.",
+            "# TYPE seasonal_last_run_timestamp_seconds gauge",
+            f"seasonal_last_run_timestamp_seconds {time.time():.0f}",
+            "# HELP seasonal_phase_worker_seconds Seconds spent in each phase of the last run, summed over threads.",
+            "# TYPE seasonal_phase_worker_seconds gauge"
+        ]
+        for name, seconds in report["phases"].items():
+            lines.append(f'seasonal_phase_worker_seconds{{phase="{name}"}} {seconds}')
+        
+        lines += [
+            "# HELP seasonal_api_requests_total Spotify API responses by endpoint and status.",
+            "# TYPE seasonal_api_requests_total counter"
+        ]
+        for endpoint, stats in report["api"]["endpoints"].items():
+            for status, calls in stats["statuses"].items():
+                lines.append(f'seasonal_api_requests_total{{endpoint="{endpoint}",status="{status}"}} {calls}')
+        
+        lines += [
+            "# HELP seasonal_api_response_bytes_total Bytes received from the Spotify API by endpoint.",
+            "# TYPE seasonal_api_response_bytes_total counter"
+        ]
+        for endpoint, stats in report["api"]["endpoints"].items():
+            lines.append(f'seasonal_api_response_bytes_total{{endpoint="{endpoint}"}} {stats["bytes"]}')
+        
+        lines += [
+            "# HELP seasonal_api_request_duration_seconds Spotify API latency by endpoint.",
+            "# TYPE seasonal_api_request_duration_seconds histogram"
+        ]
+        for endpoint, stats in report["api"]["endpoints"].items():
+            cumulative = 0
+            for bound, count in stats["latency_histogram"].items():
+                cumulative += count
+                lines.append(
+                    f'seasonal_api_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'seasonal_api_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats["seconds"]}')
+            lines.append(f'seasonal_api_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats["calls"]}')
+        
+        lines += [
+            "# HELP seasonal_api_retries_total Retried Spotify API calls by client method.",
+            "# TYPE seasonal_api_retries_total counter"
+        ]
+        for method_name, retries in report["api"]["retries"].items():
+            lines.append(f'seasonal_api_retries_total{{method="{method_name}"}} {retries}')
+        
+        write_file_atomically(path, "\n".join(lines) + "\n")
+
+def write_file_atomically(path, content):
+    """Write a file via a temporary file so readers never see it half-written."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+# Metrics for the current run
+METRICS = RunMetrics()
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing `rate` calls per second with bursts up to `burst`.
+    
+    Every client sharing a limiter also shares its pauses, so a 429 seen by
+    one of them holds back all of them until the Retry-After has passed.
+    """
+    
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+    
+    def pause(self, seconds):
+        """Hold back every call for the given number of seconds."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+    
+    def acquire(self):
+        """Block until a call is allowed."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                    self.updated_at = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class ThrottledSpotify:
+    """
+    Wraps a Spotify client to schedule every API call within Spotify's rate limits.
+    
+    Calls take a token from a shared RateLimiter first. A 429 response pauses
+    the limiter, and so every thread and every client sharing it, until its
+    Retry-After has passed, 5xx responses and dropped
+    connections are retried with jittered exponential backoff, and the number
+    of calls, throttled responses, retries and failures is counted in `stats`.
+    """
+    
+    def __init__(self, sp, limiter=None, max_retries=MAX_RETRIES):
+        self._sp = sp
+        self._limiter = limiter or RateLimiter(RATE_LIMIT)
+        self._max_retries = max_retries
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "throttled": 0, "retried": 0, "failed": 0}
+    
+    def __getattr__(self, name):
+        attr = getattr(self._sp, name)
+        if not callable(attr):
+            return attr
+        
+        def call(*args, **kwargs):
+            return self._call(name, attr, args, kwargs)
+        return call
+    
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+    
+    def _backoff(self, attempt):
+        """Exponential backoff with jitter so threads don't retry in lockstep."""
+        delay = min(60, 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def _call(self, name, method, args, kwargs):
+        # Already imported along with the client this wraps
+        import requests
+        from spotipy.exceptions import SpotifyException
+        
+        attempt = 0
+        while True:
+            self._limiter.acquire()
+            self._count("calls")
+            
+            try:
+                return method(*args, **kwargs)
+            except SpotifyException as e:
+                if e.http_status == 429:
+                    self._count("throttled")
+                    try:
+                        delay = float(e.headers.get("Retry-After"))
+                    except (TypeError, ValueError):
+                        delay = self._backoff(attempt)
+                    
+                    # Hold back every thread, not just this one
+                    self._limiter.pause(delay)
+                    logger.warning(f"Rate limited on {name}, waiting {delay:.1f}s")
+                    delay = 0
+                elif e.http_status >= 500 and name not in WRITE_METHODS:
+                    delay = self._backoff(attempt)
+                else:
+                    raise
+                error = e
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if name in WRITE_METHODS:
+                    raise
+                delay = self._backoff(attempt)
+                error = e
+            
+            if attempt >= self._max_retries:
+                self._count("failed")
+                raise error
+            
+            attempt += 1
+            self._count("retried")
+            METRICS.record_retry(name)
+            time.sleep(delay)
+
+class AuthenticationRequired(Exception):
+    """Raised when there is no usable cached token and the interactive login isn't possible."""
+
+def load_cached_token(min_validity=TOKEN_MIN_VALIDITY, cache_path=None):
+    """
+    Read the token cache and return its access token if it is still usable.
+    
+    Args:
+        min_validity: Seconds the token must stay valid for
+        cache_path: Token cache to read (defaults to TOKEN_CACHE_PATH)
+        
+    Returns:
+        The access token, or None if there is no cache, it expires too soon or
+        it doesn't cover SCOPE
+    """
+    try:
+        with open(cache_path or TOKEN_CACHE_PATH) as f:
+            token_info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    if not isinstance(token_info, dict) or "access_token" not in token_info:
+        return None
+    if token_info.get("expires_at", 0) - time.time() < min_validity:
+        return None
+    if not set(SCOPE.split()) <= set(token_info.get("scope", "").split()):
+        return None
+    return token_info["access_token"]
+
+def get_spotify_client(headless=False, refreshable=False, cache_path=None, limiter=None, session=None):
+    """
+    Initialize and return a Spotify client with proper authentication.
+    
+    Args:
+        headless: Fail with AuthenticationRequired instead of prompting for a login
+        refreshable: Always set up the OAuth manager so the token can be refreshed,
+            for runs that may outlive the cached token
+        cache_path: Token cache of the account to log in as (defaults to TOKEN_CACHE_PATH)
+        limiter: RateLimiter shared with other clients (defaults to a new one)
+        session: requests session shared with other clients (defaults to a new one)
+            
+    Returns:
+        The wrapped Spotify client
+    """
+    import spotipy
+    
+    cache_path = cache_path or TOKEN_CACHE_PATH
+    session = session or make_session()
+    
+    # One-shot runs finish well within the cached token's lifetime, so skip the OAuth manager
+    if not refreshable:
+        access_token = load_cached_token(cache_path=cache_path)
+        if access_token:
+            return wrap_spotify_client(spotipy.Spotify(auth=access_token, requests_session=session), limiter)
+    
+    from spotipy.cache_handler import CacheFileHandler
+    from spotipy.oauth2 import SpotifyOAuth
+    
     auth_manager = SpotifyOAuth(
         scope=SCOPE,
         redirect_uri="http://localhost:8888/callback",
-        open_browser=True
+        open_browser=not headless,
+        cache_handler=CacheFileHandler(cache_path=cache_path)
     )
     
     # Get the cached token or go through auth flow
     token_info = auth_manager.get_cached_token()
     if not token_info:
+        if headless:
+            raise AuthenticationRequired(
+                f"No cached Spotify token in {cache_path}; run main.py interactively once to log in"
+            )
         print("No cached token found. Please authenticate in your browser...")
         auth_url = auth_manager.get_authorize_url()
         print(f"Please visit this URL to authenticate: {auth_url}")
@@ -120,475 +595,3332 @@ def get_spotify_client():
         code = auth_manager.parse_response_code(redirect_url)
         token_info = auth_manager.get_access_token(code)
     
-    return spotipy.Spotify(auth_manager=auth_manager)
+    return wrap_spotify_client(spotipy.Spotify(auth_manager=auth_manager, requests_session=session), limiter)
 
-def get_current_season():
-    """Determine the current season based on today's date."""
-    now = datetime.now()
-    current_year = now.year
+class ResponseCache:
+    """
+    Persistent cache of API response bodies and their ETags, stored in SQLite.
     
-    # Convert season dates to actual dates for the current year
-    season_dates = {
-        season: datetime(current_year, month, day)
-        for season, (month, day) in SEASONS.items()
-    }
+    Bodies are stored gzip-compressed, keyed by URL, or for /me/ endpoints by
+    URL and token, see make_caching_adapter. Once the stored bodies
+    add up to more than max_bytes, the least recently used ones are evicted.
+    Entries are never served without asking Spotify first, see
+    make_caching_adapter.
+    """
     
-    # Handle year boundary for Winter
-    if now < season_dates["spring"]:
-        return "winter"
-    elif now < season_dates["summer"]:
-        return "spring"
-    elif now < season_dates["fall"]:
-        return "summer"
-    elif now < season_dates["winter"]:
-        return "fall"
-    else:
-        return "winter"
-
-def get_current_season_year():
-    """Get the year associated with the current season."""
-    current_season = get_current_season()
-    current_year = datetime.now().year
+    def __init__(self, path=HTTP_CACHE_PATH, max_bytes=None):
+        import sqlite3
+        
+        if max_bytes is None:
+            max_bytes = int(HTTP_CACHE_MB * 2**20)
+        self.max_bytes = max_bytes
+        
+        # Shared by every thread using the session, so every use goes through self.lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at);
+        """)
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
     
-    if current_season == "winter" and datetime.now().month < 3:
-        return current_year
+    def lookup(self, key):
+        """
+        Return the ETag and compressed body of the cached response for a key, or None.
+        
+        Both are read at once, so a body that another thread evicts afterwards
+        can still be served for the ETag that was sent.
+        """
+        with self.lock:
+            return self.conn.execute("SELECT etag, body FROM responses WHERE url = ?", (key,)).fetchone()
+    
+    def touch(self, key):
+        """Mark the cached response for a key as recently used."""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE responses SET used_at = ? WHERE url = ?", (time.time(), key))
     
-    if current_season == "winter" and datetime.now().month == 12:
-        return current_year + 1
+    def store(self, key, etag, body):
+        """Cache a response body, evicting the least recently used ones to stay within max_bytes."""
+        import gzip
         
-    return current_year
-
-def get_next_season():
-    """Determine the upcoming season."""
-    current = get_current_season()
-    seasons_list = list(SEASONS.keys())
-    current_index = seasons_list.index(current)
-    next_index = (current_index + 1) % len(seasons_list)
-    return seasons_list[next_index]
-
-def get_next_season_date():
-    """Get the date of the next season change."""
-    next_season = get_next_season()
-    current_year = datetime.now().year
-    month, day = SEASONS[next_season]
-    
-    # Handle year boundaries for different seasons
-    if next_season == "spring" and datetime.now().month > month:
-        # If we're past March and looking for spring, it's next year's spring
-        year = current_year + 1
-    elif next_season == "winter":
-        # For winter, if we're in fall (Sep-Nov), winter starts in current year (Dec)
-        # but is labeled as next year's winter
-        if datetime.now().month >= 9 and datetime.now().month <= 11:
-            # Winter 2025 starts in Dec 2024
-            year = current_year + 1
-        else:
-            # If we're in winter/spring/summer looking for next winter,
-            # it starts in Dec of current year but is labeled as next year's winter
-            year = current_year + 1
-    else:
-        # For summer and fall, or if we're in winter/spring looking for summer/fall,
-        # they occur in the current year
-        year = current_year
+        compressed = gzip.compress(body, compresslevel=6)
+        if len(compressed) > self.max_bytes:
+            return
         
-    return datetime(year, month, day)
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT size FROM responses WHERE url = ?", (key,)).fetchone()
+            self.size -= row[0] if row else 0
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, body, size, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, etag, compressed, len(compressed), time.time())
+            )
+            self.size += len(compressed)
+            
+            if self.size > self.max_bytes:
+                evicted = []
+                for old_key, size in self.conn.execute("SELECT url, size FROM responses ORDER BY used_at"):
+                    if self.size <= self.max_bytes:
+                        break
+                    evicted.append((old_key,))
+                    self.size -= size
+                self.conn.executemany("DELETE FROM responses WHERE url = ?", evicted)
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
 
-def find_or_create_seasonal_playlist(sp, season, year):
-    """Find an existing seasonal playlist or create a new one."""
-    playlist_name = f"archie + kotoha {season} {year}"
+def make_caching_adapter(cache, pool_size=10):
+    """
+    Build a requests adapter that revalidates GET responses against a ResponseCache.
     
-    # Check if playlist already exists
-    playlists = sp.current_user_playlists()
-    for playlist in playlists["items"]:
-        if playlist["name"] == playlist_name and playlist["owner"]["id"] == USER_ID:
-            print(f"Found existing playlist: {playlist_name}")
-            return playlist["id"]
-    
-    # Create new playlist if it doesn't exist
-    print(f"Creating new playlist: {playlist_name}")
-    description = f"songs from our playlist during {season} {year}"
-    new_playlist = sp.user_playlist_create(
-        user=USER_ID,
-        name=playlist_name,
-        public=False,
-        description=description
-    )
+    A GET with a cached response is sent with If-None-Match. A 304 answer is
+    turned into a 200 carrying the cached body, so spotipy never sees the
+    difference, and marked `revalidated` for the run metrics. Other
+    responses pass through unchanged, and successful ones with an ETag are
+    cached.
     
-    # Share the playlist with another user
-    playlist_id = new_playlist["id"]
-    share_playlist_with_user(sp, playlist_id, os.getenv("SPOTIPY_GIRLFRIEND_USER_ID"))  # Replace with actual Spotify user ID
+    Responses are cached by URL, except that /me/ endpoints answer for
+    whoever's token asks, so those are also keyed by a hash of the token.
+    They miss once the token is refreshed, and age out of the cache.
+    """
+    import gzip
+    import hashlib
+    import requests
     
-    return playlist_id
-
-# TODO: this is a temporary function to share the playlist - does not currently work as intended
-def share_playlist_with_user(sp, playlist_id, user_id):
-    """Share a playlist with another user by adding them as a collaborator."""
-    try:
-        if ":" in playlist_id:
-            playlist_id = playlist_id.split(":")[-1]
-            
-        # Add the user as a collaborator
-        sp._put(f"playlists/{playlist_id}/followers", payload={"public": False})
-        
-        print(f"Shared playlist with user: {user_id}")
-        return True
-    except Exception as e:
-        print(f"Error sharing playlist: {e}")
-        return False
-
-def get_tracks_added_since(sp, playlist_id, since_date=None):
-    """Get tracks from a playlist that were added after a certain date."""
-    tracks = []
-    offset = 0
-    limit = 100 
+    def cache_key(request):
+        path = urlparse(request.url).path
+        if path == "/v1/me" or path.startswith("/v1/me/"):
+            token = request.headers.get("Authorization", "")
+            return hashlib.sha256(token.encode()).hexdigest()[:16] + " " + request.url
+        return request.url
     
-    # Loop until we've retrieved all tracks
-    while True:
-        results = sp.playlist_items(
-            playlist_id,
-            fields="items(added_at,track(id,name,artists)),total,next",
-            additional_types=["track"],
-            offset=offset,
-            limit=limit
-        )
-        
-        print(f"Retrieved batch of {len(results['items'])} tracks (offset: {offset})")
-        
-        for item in results["items"]:
-            # Skip None tracks (can happen with local files)
-            if not item["track"]:
-                continue
-                
-            added_at = datetime.strptime(item["added_at"], "%Y-%m-%dT%H:%M:%SZ")
+    class CachingAdapter(requests.adapters.HTTPAdapter):
+        def send(self, request, **kwargs):
+            if request.method != "GET":
+                return super().send(request, **kwargs)
             
-            # If since_date is None, get all tracks
-            # Otherwise, only get tracks added since the specified date
-            if since_date is None or added_at >= since_date:
-                track_id = item["track"]["id"]
-                if track_id:  # Skip local tracks which have no Spotify ID
-                    tracks.append({
-                        "id": track_id,
-                        "name": item["track"]["name"],
-                        "added_at": added_at,
-                        "uri": f"spotify:track:{track_id}"
-                    })
-        
-        # If there are no more tracks to retrieve, break the loop
-        if results["next"] is None:
-            break
+            key = cache_key(request)
+            cached = cache.lookup(key)
+            if cached:
+                request.headers["If-None-Match"] = cached[0]
+            response = super().send(request, **kwargs)
             
-        # Otherwise, update the offset and continue
-        offset += limit
+            if response.status_code == 304 and cached:
+                body = gzip.decompress(cached[1])
+                cache.touch(key)
+                response.status_code = 200
+                response.reason = "OK"
+                response._content = body
+                response.headers.pop("Content-Encoding", None)
+                response.headers["Content-Length"] = str(len(body))
+                response.revalidated = True
+            elif response.status_code == 200 and response.headers.get("ETag"):
+                cache.store(key, response.headers["ETag"], response.content)
+            return response
+    
+    # Retries are left to ThrottledSpotify, as with the plain adapter in configure_session
+    return CachingAdapter(max_retries=0, pool_connections=pool_size, pool_maxsize=pool_size)
+
+def configure_session(session, pool_size=10):
+    """
+    Set a requests session up for Spotify clients.
     
-    # Sort tracks by added date (most recent first)
-    tracks.sort(key=lambda x: x["added_at"], reverse=True)
+    Mounts an adapter that leaves retries to ThrottledSpotify, revalidating
+    GET responses against the ResponseCache unless HTTP_CACHE_MB is 0, and
+    records every response in the run metrics.
+    """
+    import requests
     
-    # Print the 5 most recently added tracks for debugging
-    if tracks:
-        print("Most recently added tracks:")
-        for i, track in enumerate(tracks[:5]):
-            print(f"  {i+1}. {track['name']} (added {track['added_at']})")
+    if HTTP_CACHE_MB > 0:
+        adapter = make_caching_adapter(ResponseCache(), pool_size)
+    else:
+        # Let 429 and 5xx responses reach ThrottledSpotify instead of being retried
+        # blindly by urllib3, which would also hide the Retry-After header
+        adapter = requests.adapters.HTTPAdapter(max_retries=0, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
     
-    return tracks
+    # Record every response in the run metrics
+    session.hooks["response"].append(METRICS.record_response)
 
-def update_seasonal_playlist(sp):
-    """Update the current seasonal playlist with new tracks from the main playlist."""
-    current_season = get_current_season()
-    current_season_year = get_current_season_year()
+def make_session(pool_size=10):
+    """
+    Create a requests session for Spotify clients, which several clients can share.
+    
+    Args:
+        pool_size: Connections kept open to the API, at least the number of
+            threads making calls at once
+    """
+    import requests
     
-    print(f"Current season: {current_season} {current_season_year}")
+    session = requests.Session()
+    configure_session(session, pool_size)
+    return session
+
+def wrap_spotify_client(sp, limiter=None):
+    """Wrap a spotipy client in ThrottledSpotify, taking over retries from urllib3."""
+    # Clients created elsewhere (e.g. by the benchmarks) don't use make_session's session yet
+    if METRICS.record_response not in sp._session.hooks["response"]:
+        configure_session(sp._session)
     
-    # Find or create the seasonal playlist
-    seasonal_playlist_id = find_or_create_seasonal_playlist(sp, current_season, current_season_year)
+    return ThrottledSpotify(sp, limiter)
+
+# The season starting at the same time of year in the other hemisphere
+OPPOSITE_SEASONS = {"spring": "fall", "summer": "winter", "fall": "spring", "winter": "summer"}
+
+# Mean equinox/solstice starting each northern season, as polynomial coefficients
+# in millennia from 2000 (Meeus, Astronomical Algorithms, table 27.C)
+EQUINOX_COEFFICIENTS = {
+    "spring": (2451623.80984, 365242.37404, 0.05169, -0.00411, -0.00057),
+    "summer": (2451716.56767, 365241.62603, 0.00325, 0.00888, -0.00030),
+    "fall": (2451810.21715, 365242.01767, -0.11575, 0.00337, 0.00078),
+    "winter": (2451900.05952, 365242.74049, -0.06223, -0.00823, 0.00032)
+}
+
+# Periodic terms (A, B, C) correcting the mean times (Meeus, table 27.C)
+EQUINOX_TERMS = (
+    (485, 324.96, 1934.136), (203, 337.23, 32964.467), (199, 342.08, 20.186),
+    (182, 27.85, 445267.112), (156, 73.14, 45036.886), (136, 171.52, 22518.443),
+    (77, 222.54, 65928.934), (74, 296.72, 3034.906), (70, 243.58, 9037.513),
+    (58, 119.81, 33718.147), (52, 297.17, 150.678), (50, 21.02, 2281.226),
+    (45, 247.54, 29929.562), (44, 325.15, 31555.956), (29, 60.93, 4443.417),
+    (18, 155.12, 67555.328), (17, 288.79, 4562.452), (16, 198.04, 62894.029),
+    (14, 199.76, 31436.921), (12, 95.39, 14577.848), (12, 287.11, 31931.756),
+    (12, 320.81, 34777.259), (9, 227.73, 1222.114), (8, 15.45, 16859.074)
+)
+
+def astronomical_season_start(season, year):
+    """
+    Return the equinox or solstice starting a northern season, in UTC epoch seconds.
     
-    # Get tracks already in the seasonal playlist
-    existing_tracks = sp.playlist_items(
-        seasonal_playlist_id, 
-        fields="items(track(id))",
-        additional_types=["track"],
-        limit=100
-    )
+    Uses Meeus's algorithm, which is accurate to about a minute for years 1000-3000.
+    """
+    y = (year - 2000) / 1000
+    jde0 = sum(coefficient * y ** power for power, coefficient in enumerate(EQUINOX_COEFFICIENTS[season]))
+    t = (jde0 - 2451545.0) / 36525
+    w = math.radians(35999.373 * t - 2.47)
+    delta_lambda = 1 + 0.0334 * math.cos(w) + 0.0007 * math.cos(2 * w)
+    s = sum(a * math.cos(math.radians(b + c * t)) for a, b, c in EQUINOX_TERMS)
+    jde = jde0 + 0.00001 * s / delta_lambda
     
-    # Get all existing tracks with pagination
-    existing_track_ids = []
-    results = existing_tracks
+    # JDE counts Terrestrial Time, which runs about 69 seconds ahead of UTC
+    return round((jde - 2440587.5) * 86400 - 69)
+
+class PeriodCalendar:
+    """
+    Precomputed table of period boundaries, answering lookups with binary searches.
     
-    while True:
-        # Add track IDs from current batch
-        for item in results["items"]:
-            if item["track"] and item["track"]["id"]:
-                existing_track_ids.append(item["track"]["id"])
-        
-        # Check if there are more tracks to retrieve
-        if results.get("next"):
-            results = sp.next(results)
-        else:
-            break
+    Entry i of `boundaries` starts period i, which lasts until entry i + 1.
+    Each entry has the period's 'name', its 'year' label, and its start as
+    UTC epoch seconds ('timestamp') and as a naive datetime in the calendar's
+    time zone ('date'). Periods are labelled with the year most of the period
+    falls in. An entry named None starts a gap that belongs to no period.
     
-    print(f"Found {len(existing_track_ids)} existing tracks in the seasonal playlist")
+    Args:
+        starts: (timestamp, name) of every period start, with the last one
+            only ending the period before it
+        timezone: IANA time zone of 'date' (defaults to SEASON_TIMEZONE)
+    """
     
-    # Calculate the current season's start date
-    month, day = SEASONS[current_season]
+    def __init__(self, starts, timezone=None):
+        from zoneinfo import ZoneInfo
+        
+        self.timezone = ZoneInfo(timezone or SEASON_TIMEZONE)
+        starts = sorted(starts, key=lambda start: start[0])
+        
+        self.boundaries = []
+        for i, (timestamp, name) in enumerate(starts):
+            # The last entry only ends the period before it, so assume a typical season length
+            end = starts[i + 1][0] if i + 1 < len(starts) else timestamp + 91 * 86400
+            self.boundaries.append({
+                'name': name,
+                'year': self.to_datetime((timestamp + end) // 2).year,
+                'date': self.to_datetime(timestamp),
+                'timestamp': timestamp
+            })
+        
+        self.starts = [boundary['timestamp'] for boundary in self.boundaries]
+        self.periods = {
+            (boundary['name'], boundary['year']): i for i, boundary in enumerate(self.boundaries[:-1])
+            if boundary['name'] is not None
+        }
     
-    # For winter, we need to handle the year differently
-    if current_season == "winter":
-        # Winter 2024 starts in December 2023
-        season_start = datetime(current_season_year - 1, month, day)
-    else:
-        season_start = datetime(current_season_year, month, day)
-    
-    # Calculate the next season's start date (which is the end date for current season)
-    seasons_list = list(SEASONS.keys())
-    current_index = seasons_list.index(current_season)
-    next_index = (current_index + 1) % len(seasons_list)
-    next_season = seasons_list[next_index]
-    next_month, next_day = SEASONS[next_season]
-    
-    # Next season is always in the current_season_year, except when winter transitions to spring
-    if current_season == "winter" and next_season == "spring":
-        season_end = datetime(current_season_year, next_month, next_day)
-    else:
-        season_end = datetime(current_season_year, next_month, next_day)
+    def to_datetime(self, timestamp):
+        """Convert UTC epoch seconds to a naive datetime in the calendar's time zone."""
+        return datetime.fromtimestamp(timestamp, self.timezone).replace(tzinfo=None)
     
-    print(f"Season date range: {season_start} to {season_end}")
+    def period_at(self, timestamp):
+        """Return the index of the period containing timestamp, or None if it's outside every period."""
+        i = bisect_right(self.starts, timestamp) - 1
+        if 0 <= i < len(self.starts) - 1 and self.boundaries[i]['name'] is not None:
+            return i
+        return None
     
-    # Get tracks from the main playlist
-    main_tracks = get_tracks_added_since(sp, MAIN_PLAYLIST_ID)
-    print(f"Retrieved {len(main_tracks)} tracks from main playlist")
+    def classify(self, timestamps):
+        """
+        Return the period index (or None) of each of a batch of timestamps.
+        
+        Ascending runs of timestamps are walked along the boundary table in a
+        single merge pass, and only a step back costs a binary search, so
+        sorted timestamps take O(n + periods).
+        """
+        starts = self.starts
+        last = len(starts) - 1
+        periods = []
+        i = -1
+        previous = None
+        for timestamp in timestamps:
+            if previous is None or timestamp < previous:
+                i = bisect_right(starts, timestamp) - 1
+            else:
+                while i < last and timestamp >= starts[i + 1]:
+                    i += 1
+            previous = timestamp
+            periods.append(i if 0 <= i < last and self.boundaries[i]['name'] is not None else None)
+        return periods
     
-    # Filter tracks to only include those added during the current season
-    current_season_tracks = []
-    for track in main_tracks:
-        added_at = track["added_at"]
-        if season_start <= added_at < season_end:
-            current_season_tracks.append(track)
+    def period_start(self, i):
+        return self.starts[i]
     
-    print(f"Found {len(current_season_tracks)} tracks for current season")
+    def period_end(self, i):
+        return self.starts[i + 1]
     
-    # Debug: Print all existing track IDs
-    print("First few existing track IDs in seasonal playlist:")
-    for i, track_id in enumerate(existing_track_ids[:5]):
-        print(f"  {i+1}. {track_id}")
+    def find_period(self, name, year):
+        """Return the index of the named period, or None if it's outside the table."""
+        return self.periods.get((name, year))
     
-    # Filter out tracks that are already in the seasonal playlist
-    new_tracks = []
-    for track in current_season_tracks:
-        if track["id"] not in existing_track_ids:
-            new_tracks.append(track)
-            print(f"New track detected: {track['name']} (ID: {track['id']})")
-    
-    if new_tracks:
-        print(f"New tracks to add: {len(new_tracks)}")
-        for track in new_tracks:
-            print(f"  - {track['name']} (added {track['added_at']})")
-        
-        # Add new tracks to the seasonal playlist
-        track_uris = [track["uri"] for track in new_tracks]
-        
-        # Spotify has a limit of 100 tracks per request
-        for i in range(0, len(track_uris), 100):
-            batch = track_uris[i:i+100]
-            sp.playlist_add_items(seasonal_playlist_id, batch)
-            
-        print(f"Added {len(new_tracks)} new tracks to {current_season} {current_season_year} playlist")
-    else:
-        print("No new tracks to add")
+    def next_boundary(self, timestamp):
+        """Return the entry of the first period to start after timestamp, or None if there is none."""
+        for boundary in self.boundaries[bisect_right(self.starts, timestamp):-1]:
+            if boundary['name'] is not None:
+                return boundary
+        return None
+    
+    def bucket(self, tracks):
+        """
+        Assign tracks sorted by added_at (oldest first) to periods in a single pass, see classify.
         
-        # Debug: Print the first few tracks from the main playlist that fall within the season
-        if current_season_tracks:
-            print("Tracks from main playlist that fall within the current season:")
-            for i, track in enumerate(current_season_tracks[:5]):
-                print(f"  {i+1}. {track['name']} (added {track['added_at']})")
-                print(f"     Track ID: {track['id']}")
-                
-            # Debug: Check if these tracks are actually in the existing_track_ids
-            for i, track in enumerate(current_season_tracks[:5]):
-                is_in_playlist = track["id"] in existing_track_ids
-                print(f"  {i+1}. {track['name']} - In playlist: {is_in_playlist}")
-
-def check_for_season_change(sp):
-    """Check if it's time to create the next season's playlist."""
-    next_season = get_next_season()
-    next_season_date = get_next_season_date()
-    today = datetime.now()
-    
-    # If we're within 1 day of the season change, create the next season's playlist
-    if abs((next_season_date - today).days) <= 1:
-        # Calculate the correct year for the next season
-        year = next_season_date.year
-        
-        # If it's winter starting in December, the year should be the current year
-        if next_season == "winter" and next_season_date.month == 12:
-            year = today.year
-            
-        find_or_create_seasonal_playlist(sp, next_season, year)
-        print(f"Created playlist for upcoming season: {next_season} {year}")
+        Returns one list of tracks per period. Tracks outside every period,
+        including those in gaps between periods, are left out.
+        """
+        buckets = [[] for _ in range(max(len(self.starts) - 1, 0))]
+        for track, period in zip(tracks, self.classify([track.added_at for track in tracks])):
+            if period is not None:
+                buckets[period].append(track)
+        return buckets
 
-def create_retroactive_seasonal_playlists(sp, start_year=None):
+class SeasonCalendar(PeriodCalendar):
     """
-    Create seasonal playlists retroactively based on when songs were added to the main playlist.
+    PeriodCalendar of the seasons of a range of years.
+    
+    Seasons are labelled with the year most of the season falls in, so the
+    winter starting in December 2023 is winter 2024.
     
     Args:
-        sp: Spotify client
-        start_year: The year to start creating playlists from (defaults to current year - 1)
+        first_year: First year whose seasons are in the table
+        last_year: Last year whose seasons are in the table
+        boundaries: "fixed" to start seasons at midnight on their SEASONS dates,
+            or "astronomical" for the exact equinox and solstice times
+            (defaults to SEASON_BOUNDARIES)
+        hemisphere: "north" or "south" (defaults to SEASON_HEMISPHERE)
+        timezone: IANA time zone of fixed boundaries and of 'date' (defaults to SEASON_TIMEZONE)
     """
-    if start_year is None:
-        start_year = datetime.now().year - 1
     
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-    current_day = datetime.now().day
-    
-    # Get all tracks from the main playlist with their added dates
-    all_tracks = get_tracks_added_since(sp, MAIN_PLAYLIST_ID)
+    def __init__(self, first_year, last_year, boundaries=None, hemisphere=None, timezone=None):
+        from zoneinfo import ZoneInfo
+        
+        self.mode = boundaries or SEASON_BOUNDARIES
+        self.hemisphere = hemisphere or SEASON_HEMISPHERE
+        if self.mode not in ("fixed", "astronomical"):
+            raise ValueError(f"Unknown season boundaries: {self.mode}")
+        if self.hemisphere not in ("north", "south"):
+            raise ValueError(f"Unknown hemisphere: {self.hemisphere}")
+        
+        zone = ZoneInfo(timezone or SEASON_TIMEZONE)
+        starts = []
+        for year in range(first_year, last_year + 1):
+            for season in SEASONS:
+                # A southern season starts when the opposite northern one does
+                northern_season = OPPOSITE_SEASONS[season] if self.hemisphere == "south" else season
+                if self.mode == "astronomical":
+                    timestamp = astronomical_season_start(northern_season, year)
+                else:
+                    month, day = SEASONS[northern_season]
+                    timestamp = int(datetime(year, month, day, tzinfo=zone).timestamp())
+                starts.append((timestamp, season))
+        super().__init__(starts, timezone)
+
+def fixed_date_starts(first_year, last_year, dates, timezone=None):
+    """
+    Return the (timestamp, name) starts of periods beginning on the same dates every year.
     
-    print(f"Retrieved {len(all_tracks)} tracks from main playlist")
+    Args:
+        first_year: First year whose periods are included
+        last_year: Last year whose periods are included
+        dates: Period name -> (month, day) it starts on, at midnight
+        timezone: IANA time zone of that midnight (defaults to SEASON_TIMEZONE)
+    """
+    from zoneinfo import ZoneInfo
     
-    # Sort tracks by added date
-    all_tracks.sort(key=lambda x: x["added_at"])
+    zone = ZoneInfo(timezone or SEASON_TIMEZONE)
+    starts = []
+    for year in range(first_year, last_year + 1):
+        for name, (month, day) in dates.items():
+            starts.append((int(datetime(year, month, day, tzinfo=zone).timestamp()), name))
+    return starts
+
+def custom_range_starts(ranges, timezone=None):
+    """
+    Return the (timestamp, name) starts of periods given as explicit date ranges.
     
-    if not all_tracks:
-        print("No tracks found in the main playlist")
-        return
+    Args:
+        ranges: Sorted, non-overlapping (name, start date, end date) tuples,
+            where a period runs from midnight on its start date until
+            midnight on its end date
+        timezone: IANA time zone of those midnights (defaults to SEASON_TIMEZONE)
+    """
+    from zoneinfo import ZoneInfo
     
-    # Get the earliest and latest dates
-    earliest_date = all_tracks[0]["added_at"]
-    latest_date = all_tracks[-1]["added_at"]
+    zone = ZoneInfo(timezone or SEASON_TIMEZONE)
+    starts = []
+    for name, start, end in ranges:
+        start = int(datetime.combine(start, datetime.min.time(), zone).timestamp())
+        if starts and starts[-1][0] == start:
+            starts.pop()
+        starts.append((start, name))
+        # A gap until the next range starts, or the end of the last one
+        starts.append((int(datetime.combine(end, datetime.min.time(), zone).timestamp()), None))
+    return starts
+
+@lru_cache(maxsize=32)
+def _season_calendar(first_year, last_year):
+    return SeasonCalendar(first_year, last_year)
+
+def get_season_calendar(first_year=None, last_year=None):
+    """
+    Return the configured SeasonCalendar for a range of years, built once per range.
     
-    print(f"Earliest track date: {earliest_date}")
-    print(f"Latest track date: {latest_date}")
+    The default range, last year through next year, covers the current and next season.
+    """
+    this_year = datetime.now().year
+    return _season_calendar(
+        this_year - 1 if first_year is None else first_year,
+        this_year + 1 if last_year is None else last_year
+    )
+
+def parse_scheme(entry):
+    """
+    Check a period scheme from a job's "schemes" and return it as a dict.
     
-    # Ensure we don't go earlier than the start_year
-    earliest_year = max(earliest_date.year, start_year)
+    An entry is either the name of a built-in scheme ("season", "month",
+    "quarter" or "term") or a dict with its "scheme" and optionally its own
+    "name", "name_template" and "description_template". A yearly scheme can
+    set its own "dates" as {"period name": "MM-DD"}, and a "custom" scheme
+    lists "ranges" of {"name", "start", "end"} with ISO dates, the end
+    excluded.
     
-    # Reorder seasons to start with winter
-    ordered_seasons = ["winter", "spring", "summer", "fall"]
+    Raises:
+        ValueError: If the entry isn't a valid scheme
+    """
+    if isinstance(entry, str):
+        entry = {"scheme": entry}
+    kind = entry.get("scheme")
+    if kind not in ("season", "custom", *PERIOD_DATES):
+        raise ValueError(f"Unknown period scheme: {kind}")
+    scheme = {**entry, "name": entry.get("name", kind)}
     
-    # Create a list of season boundaries
-    season_boundaries = []
+    if kind == "custom":
+        if not entry.get("ranges"):
+            raise ValueError(f"Period scheme {scheme['name']} has no ranges")
+        previous_end = None
+        for period in entry["ranges"]:
+            try:
+                start, end = date.fromisoformat(period["start"]), date.fromisoformat(period["end"])
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Period scheme {scheme['name']} has an invalid range {period}: {e}")
+            if not period.get("name") or start >= end or (previous_end and start < previous_end):
+                raise ValueError(f"Period scheme {scheme['name']} needs named, sorted, non-overlapping ranges")
+            previous_end = end
+    elif "dates" in entry:
+        if kind == "season" or not entry["dates"]:
+            raise ValueError(f"Period scheme {scheme['name']} can't have dates")
+        for name, month_day in entry["dates"].items():
+            try:
+                date.fromisoformat(f"2000-{month_day}")
+            except (TypeError, ValueError):
+                raise ValueError(f"Period scheme {scheme['name']} has an invalid date for {name}: {month_day}")
+    return scheme
+
+def job_schemes(job):
+    """
+    Split a job into one job per period scheme.
     
-    # Generate all season boundaries from earliest year to current year
-    for year in range(earliest_year - 1, current_year + 2):  # Add buffer years
-        for season in ordered_seasons:
-            month, day = SEASONS[season]
-            
-            # For winter, associate it with the following year
-            # (e.g., Winter 2023 starts in Dec 2022 and ends in Mar 2023)
-            if season == "winter":
-                # Winter that starts in December of the previous year
-                season_year = year + 1
-                season_boundaries.append({
-                    'name': season,
-                    'year': season_year,
-                    'date': datetime(year, month, day)  # December of previous year
-                })
-            else:
-                season_boundaries.append({
-                    'name': season,
-                    'year': year,
-                    'date': datetime(year, month, day)
-                })
+    Each has the job's settings, "scheme" set to one of its schemes, and
+    that scheme's own templates (if any) in place of the job's. Everything
+    that reads or writes the playlists of a single scheme takes one of these.
+    Jobs without "schemes" only have seasons.
+    """
+    if "scheme" in job:
+        return [job]
+    return [
+        {
+            **job,
+            "scheme": scheme,
+            "name_template": scheme.get("name_template", job["name_template"]),
+            "description_template": scheme.get("description_template", job["description_template"])
+        }
+        for scheme in job.get("schemes") or [parse_scheme("season")]
+    ]
+
+@lru_cache(maxsize=32)
+def _period_calendar(kind, dates, ranges, first_year, last_year):
+    if kind == "custom":
+        return PeriodCalendar(custom_range_starts(ranges))
+    return PeriodCalendar(fixed_date_starts(first_year, last_year, {name: (month, day) for name, month, day in dates}))
+
+def get_period_calendar(job=None, first_year=None, last_year=None):
+    """
+    Return the calendar of a job's period scheme for a range of years, built once per range.
     
-    # Sort boundaries by date
-    season_boundaries.sort(key=lambda x: x['date'])
+    Jobs from job_schemes have a scheme; anything else gets the SeasonCalendar.
+    Custom schemes cover their own ranges whatever years are asked for.
+    """
+    scheme = (job or {}).get("scheme")
+    if scheme is None or scheme["scheme"] == "season":
+        return get_season_calendar(first_year, last_year)
     
-    # Filter out boundaries that are too early or too late
-    season_boundaries = [b for b in season_boundaries 
-                         if b['date'] >= datetime(earliest_year - 1, 1, 1) and 
-                            b['date'] <= datetime(current_year + 1, 12, 31)]
+    this_year = datetime.now().year
+    dates = ranges = ()
+    if scheme["scheme"] == "custom":
+        ranges = tuple(
+            (period["name"], date.fromisoformat(period["start"]), date.fromisoformat(period["end"]))
+            for period in scheme["ranges"]
+        )
+    elif "dates" in scheme:
+        dates = tuple(
+            (name, *(int(part) for part in month_day.split("-"))) for name, month_day in scheme["dates"].items()
+        )
+    else:
+        dates = tuple((name, month, day) for name, (month, day) in PERIOD_DATES[scheme["scheme"]].items())
+    return _period_calendar(
+        scheme["scheme"], dates, ranges,
+        this_year - 1 if first_year is None else first_year,
+        this_year + 1 if last_year is None else last_year
+    )
+
+def default_job():
+    """
+    Return the job configured by the SPOTIPY_* environment variables.
     
-    # Create a dictionary to hold tracks for each season period
-    seasonal_tracks = {}
+    A job maps its sources (the main playlist, plus any other playlists or
+    Liked Songs, see source_keys) to a set of seasonal playlists owned by one
+    user, for each of its period schemes (see job_schemes). Runs without
+    --config have this single job; see load_run_config for running several.
+    """
+    return {
+        "name": "default",
+        "source": MAIN_PLAYLIST_ID,
+        "sources": [MAIN_PLAYLIST_ID] + [source.strip() for source in EXTRA_SOURCES.split(",") if source.strip()],
+        "user_id": USER_ID,
+        "name_template": PLAYLIST_NAME_TEMPLATE,
+        "description_template": PLAYLIST_DESCRIPTION_TEMPLATE,
+        "share_with": os.getenv("SPOTIPY_GIRLFRIEND_USER_ID"),
+        "schemes": [parse_scheme(name.strip()) for name in PERIOD_SCHEMES.split(",")]
+    }
+
+# Name -> ID index of each user's own playlists, built once per run
+_playlist_indexes = {}
+# Guards _playlist_indexes, _playlist_index_locks and the indexes themselves, and is
+# never held during an API call
+_playlist_index_lock = threading.Lock()
+# One lock per user for building their index and one per user and playlist name for
+# creating that playlist, so a slow listing or create call only holds up threads
+# waiting on the same user or playlist
+_playlist_index_locks = {}
+# Saving rewrites the file every user's index is kept in
+_playlist_index_file_lock = threading.Lock()
+
+def playlist_index_lock(*key):
+    """Return the lock for building a user's index, or creating one of their playlists."""
+    with _playlist_index_lock:
+        return _playlist_index_locks.setdefault(key, threading.Lock())
+
+def build_playlist_index(sp, user_id):
+    """Page through all of the user's playlists and index the ones they own by name."""
+    index = {}
+    results = sp.current_user_playlists(limit=50)
     
-    # Process each season period
-    for i in range(len(season_boundaries) - 1):
-        current_boundary = season_boundaries[i]
-        next_boundary = season_boundaries[i + 1]
+    while True:
+        for playlist in results["items"]:
+            # Keep the first match, like the old single-page lookup did
+            if playlist["owner"]["id"] == user_id and playlist["name"] not in index:
+                index[playlist["name"]] = playlist["id"]
         
-        season_start = current_boundary['date']
-        season_end = next_boundary['date']
-        season = current_boundary['name']
-        year = current_boundary['year']
+        if results.get("next"):
+            results = sp.next(results)
+        else:
+            break
+    
+    logger.info(f"Indexed {len(index)} of {user_id}'s playlists")
+    return index
+
+def load_saved_playlist_indexes():
+    """Load every user's saved playlist index, or an empty dict if there is none."""
+    try:
+        with open(PLAYLIST_INDEX_PATH) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return saved if isinstance(saved, dict) else {}
+
+def load_playlist_index(user_id):
+    """Load the user's saved playlist index if it's still within PLAYLIST_INDEX_TTL."""
+    if PLAYLIST_INDEX_TTL <= 0:
+        return None
+    
+    saved = load_saved_playlist_indexes().get(user_id)
+    if not isinstance(saved, dict) or time.time() - saved.get("saved_at", 0) > PLAYLIST_INDEX_TTL:
+        return None
+    return saved["playlists"]
+
+def save_playlist_index(user_id, index):
+    """Save the user's playlist index to disk if persistence is enabled."""
+    if PLAYLIST_INDEX_TTL <= 0:
+        return
+    with _playlist_index_file_lock:
+        # Copied in here so a save that raced with another can't overwrite it with an older copy
+        with _playlist_index_lock:
+            playlists = dict(index)
+        saved = load_saved_playlist_indexes()
+        saved[user_id] = {"saved_at": time.time(), "playlists": playlists}
+        write_file_atomically(PLAYLIST_INDEX_PATH, json.dumps(saved, indent=2))
+
+def get_playlist_index(sp, user_id=None):
+    """Return the name -> ID index of the user's playlists, building it on first use."""
+    user_id = user_id or USER_ID
+    with _playlist_index_lock:
+        if user_id in _playlist_indexes:
+            return _playlist_indexes[user_id]
+    
+    # Only threads after the same user's index wait while it's listed
+    with playlist_index_lock(user_id):
+        with _playlist_index_lock:
+            if user_id in _playlist_indexes:
+                return _playlist_indexes[user_id]
+        index = load_playlist_index(user_id)
+        if index is None:
+            index = build_playlist_index(sp, user_id)
+            save_playlist_index(user_id, index)
+        with _playlist_index_lock:
+            _playlist_indexes[user_id] = index
+        return index
+
+def find_seasonal_playlist(sp, season, year, job=None):
+    """Return the ID of an existing seasonal playlist, or None if it doesn't exist yet."""
+    job = job or default_job()
+    playlist_name = job["name_template"].format(season=season, period=season, year=year)
+    playlist_index = get_playlist_index(sp, job["user_id"])
+    with _playlist_index_lock:
+        return playlist_index.get(playlist_name)
+
+def find_or_create_seasonal_playlist(sp, season, year, job=None):
+    """Find an existing seasonal playlist or create a new one."""
+    job = job or default_job()
+    playlist_name = job["name_template"].format(season=season, period=season, year=year)
+    
+    # Check if playlist already exists
+    playlist_index = get_playlist_index(sp, job["user_id"])
+    
+    # Hold this playlist's lock while creating so concurrent workers can't create it twice
+    with playlist_index_lock(job["user_id"], playlist_name):
+        with _playlist_index_lock:
+            playlist_id = playlist_index.get(playlist_name)
+        if playlist_id:
+            logger.info(f"Found existing playlist: {playlist_name}")
+            return playlist_id
+        
+        # Create new playlist if it doesn't exist
+        logger.info(f"Creating new playlist: {playlist_name}")
+        description = job["description_template"].format(season=season, period=season, year=year)
+        new_playlist = sp.user_playlist_create(
+            user=job["user_id"],
+            name=playlist_name,
+            public=False,
+            description=description
+        )
+        
+        # Keep the index up to date so later lookups in this run find the new playlist
+        playlist_id = new_playlist["id"]
+        with _playlist_index_lock:
+            playlist_index[playlist_name] = playlist_id
+        save_playlist_index(job["user_id"], playlist_index)
+    
+    # Share the playlist with another user, if the job names one
+    if job["share_with"]:
+        share_playlist_with_user(sp, playlist_id, job["share_with"])
+    
+    return playlist_id
+
+# TODO: this is a temporary function to share the playlist - does not currently work as intended
+def share_playlist_with_user(sp, playlist_id, user_id):
+    """Share a playlist with another user by adding them as a collaborator."""
+    try:
+        if ":" in playlist_id:
+            playlist_id = playlist_id.split(":")[-1]
+            
+        # Add the user as a collaborator
+        sp._put(f"playlists/{playlist_id}/followers", payload={"public": False})
+        
+        logger.info(f"Shared playlist with user: {user_id}")
+        return True
+    except Exception as e:
+        logger.error(f"Error sharing playlist: {e}")
+        return False
+
+class Track:
+    """
+    A track read from a playlist.
+    
+    Full reads keep one of these per playlist item, so they use __slots__
+    and store added_at as UTC epoch seconds; the URI is derived from the ID
+    when needed rather than stored.
+    """
+    __slots__ = ("id", "name", "added_at")
+    
+    def __init__(self, track_id, name, added_at):
+        self.id = track_id
+        self.name = name
+        self.added_at = added_at
+    
+    @property
+    def uri(self):
+        return f"spotify:track:{self.id}"
+    
+    def __repr__(self):
+        return f"Track({self.id!r}, {self.name!r}, {format_timestamp(self.added_at)})"
+
+# Sort key for tracks by when they were added
+by_added_at = attrgetter("added_at")
+
+@lru_cache(maxsize=4096)
+def _epoch_day(day):
+    """Return the UTC epoch seconds at the start of a "YYYY-MM-DD" date."""
+    return calendar.timegm((int(day[0:4]), int(day[5:7]), int(day[8:10]), 0, 0, 0))
+
+def parse_timestamp(value):
+    """
+    Parse an API timestamp ("2024-03-01T12:34:56Z") into UTC epoch seconds.
+    
+    The API always uses this fixed format, so slicing it is several times
+    faster than datetime.strptime, and the date part repeats often enough
+    across a playlist to be cached.
+    """
+    return (_epoch_day(value[:10]) + int(value[11:13]) * 3600
+            + int(value[14:16]) * 60 + int(value[17:19]))
+
+def format_timestamp(timestamp):
+    """Format UTC epoch seconds the way the API does."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+def to_timestamp(value):
+    """Convert a naive datetime, taken as UTC like the API's timestamps, to epoch seconds."""
+    return calendar.timegm(value.timetuple())
+
+def from_timestamp(timestamp):
+    """Convert UTC epoch seconds to a naive datetime."""
+    return datetime(1970, 1, 1) + timedelta(seconds=timestamp)
+
+def print_recent_tracks(tracks):
+    """Print the 5 most recently added tracks for debugging."""
+    if tracks:
+        logger.debug("Most recently added tracks:")
+        for i, track in enumerate(tracks[:5]):
+            logger.debug(f"  {i+1}. {track.name} (added {format_timestamp(track.added_at)})")
+
+def fetch_playlist_page(sp, playlist_id, offset, limit=100):
+    """Fetch a single page of playlist items starting at the given offset."""
+    results = sp.playlist_items(
+        playlist_id,
+        fields="items(added_at,added_by.id,track(id,name,duration_ms,artists(id))),total,next",
+        additional_types=["track"],
+        offset=offset,
+        limit=limit
+    )
+    
+    logger.debug(f"Retrieved batch of {len(results['items'])} tracks (offset: {offset})")
+    
+    return results
+
+def fetch_saved_tracks_page(sp, offset, limit=50):
+    """Fetch a single page of the current user's Liked Songs, newest first, starting at the given offset."""
+    results = sp.current_user_saved_tracks(limit=limit, offset=offset)
+    
+    logger.debug(f"Retrieved batch of {len(results['items'])} liked songs (offset: {offset})")
+    
+    return results
+
+def iter_pages(fetch, offsets, concurrency=None):
+    """
+    Fetch the pages at the given offsets with fetch(offset), yielding (offset, page) in order.
+    
+    Up to `concurrency` pages (defaults to PAGE_CONCURRENCY) are in flight at
+    once, and the next one is only requested once the oldest has been
+    handed over, so a slow consumer holds the reads back instead of letting
+    pages pile up in memory.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    
+    if concurrency is None:
+        concurrency = PAGE_CONCURRENCY
+    concurrency = max(1, concurrency)
+    offsets = iter(offsets)
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque()
+        for offset in offsets:
+            pending.append((offset, executor.submit(fetch, offset)))
+            if len(pending) == concurrency:
+                break
+        
+        while pending:
+            offset, future = pending.popleft()
+            page = future.result()
+            next_offset = next(offsets, None)
+            if next_offset is not None:
+                pending.append((next_offset, executor.submit(fetch, next_offset)))
+            yield offset, page
+
+def iter_playlist_pages(sp, playlist_id, offsets, concurrency=None):
+    """Fetch the playlist pages at the given offsets, yielding (offset, page) in order, see iter_pages."""
+    return iter_pages(lambda offset: fetch_playlist_page(sp, playlist_id, offset), offsets, concurrency)
+
+def get_playlist_snapshot(sp, playlist_id):
+    """Get a playlist's current snapshot_id and track count with a single request."""
+    playlist = sp.playlist(playlist_id, fields="snapshot_id,tracks(total)")
+    return playlist["snapshot_id"], playlist["tracks"]["total"]
+
+def get_playlist_track_ids(sp, playlist_id):
+    """Get the IDs of every track in a playlist, following pagination."""
+    results = sp.playlist_items(
+        playlist_id, 
+        fields="items(track(id)),next",
+        additional_types=["track"],
+        limit=100
+    )
+    
+    track_ids = []
+    
+    while True:
+        # Add track IDs from current batch
+        for item in results["items"]:
+            if item["track"] and item["track"]["id"]:
+                track_ids.append(item["track"]["id"])
+        
+        # Check if there are more tracks to retrieve
+        if results.get("next"):
+            results = sp.next(results)
+        else:
+            break
+    
+    return track_ids
+
+def is_saved_tracks(source_key):
+    """Whether a mirror ID stands for a user's Liked Songs rather than a playlist."""
+    return source_key.startswith(f"{LIKED_SONGS}:")
+
+def source_keys(job):
+    """
+    Return the PlaylistMirror IDs of a job's sources, in order.
+    
+    Playlists are mirrored under their own ID, and the Liked Songs of the
+    job's account as "liked:<user ID>".
+    """
+    return [
+        f"{LIKED_SONGS}:{job['user_id']}" if source == LIKED_SONGS else source
+        for source in job.get("sources") or [job["source"]]
+    ]
+
+def merge_tracks(sources, newest_first=False, added_at=attrgetter("added_at"), track_id=attrgetter("id")):
+    """
+    Merge the tracks of several sources, each sorted by added_at, into one sorted stream.
+    
+    The sources are combined with a heap-based k-way merge, so each track
+    costs O(log k) and nothing is re-sorted; sources are only read as far as
+    the merge has got. Tracks added at the same time are ordered by ID, so
+    the result doesn't depend on the order of the sources. A track found in
+    more than one source is only kept from the source that yields it first,
+    i.e. where it was added first (or last, with newest_first). Repeats
+    within a source are kept, so a single source comes out unchanged. Telling
+    repeats across sources apart takes one entry per distinct track ID seen.
+    
+    Args:
+        sources: One iterable of tracks per source
+        newest_first: The sources are sorted newest first
+        added_at: Returns a track's added_at (defaults to the Track attribute)
+        track_id: Returns a track's ID (defaults to the Track attribute)
+    """
+    import heapq
+    
+    if len(sources) == 1:
+        yield from sources[0]
+        return
+    
+    def tagged(source, i):
+        for track in source:
+            yield i, track
+    
+    owners = {}
+    merged = heapq.merge(
+        *(tagged(source, i) for i, source in enumerate(sources)),
+        key=lambda entry: (added_at(entry[1]), track_id(entry[1]) or ""), reverse=newest_first
+    )
+    for i, track in merged:
+        # Local files have no ID to match them by
+        key = track_id(track)
+        if key is None or owners.setdefault(key, i) == i:
+            yield track
+
+def source_owners(mirror, keys):
+    """
+    Return the source each track was first added to, by track ID.
+    
+    A track that is in several sources only belongs in the seasonal
+    playlists through this one, the same as merge_tracks keeps it from the
+    source where it was added first. Needs complete mirrors of the sources.
+    """
+    owners = {}
+    first = {}
+    for key in keys:
+        for track_id, added_at in mirror.first_added(key).items():
+            if track_id not in first or added_at < first[track_id]:
+                first[track_id] = added_at
+                owners[track_id] = key
+    return owners
+
+def sync_sources(sp, mirror, keys, since=None, full=False):
+    """
+    Bring the PlaylistMirror copy of every source up to date at once, see PlaylistMirror.sync.
+    
+    Returns the source's snapshot_id with one source, or the sources'
+    snapshot_ids joined by "|" with several.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    if len(keys) == 1:
+        return mirror.sync(sp, keys[0], since, full=full)
+    with ThreadPoolExecutor(max_workers=len(keys)) as executor:
+        return "|".join(executor.map(lambda key: mirror.sync(sp, key, since, full=full), keys))
+
+class PlaylistMirror:
+    """
+    Local copy of source playlists in SQLite, one row per playlist item.
+    
+    Each row keeps the item's position, track ID, name, duration and artist
+    IDs, who added it and when (UTC epoch seconds), with an index on
+    added_at so date ranges are answered locally. sync() brings a copy up to
+    date: an unchanged snapshot_id costs one metadata request. A changed one
+    is taken to mean items were appended, and just the new pages are read,
+    as long as the last item we have is still in its place; otherwise (e.g.
+    after a removal) the copy is rebuilt. Moves that leave the total and the
+    last item where they were can't be told apart from appends this way, so
+    they only reach the copy once it's read again with full=True. A copy may
+    only reach back to some date, e.g. the start of the current season, and
+    is extended backwards the first time older items are asked for.
+    
+    A user's Liked Songs are mirrored the same way under the ID
+    "liked:<user ID>" (see source_keys), read with the client of that user.
+    The API lists them newest first, so positions are counted from the
+    oldest like to keep them in the order the songs were added.
+    """
+    
+    def __init__(self, path=MIRROR_PATH):
+        import sqlite3
+        
+        # Shared between jobs, so every use goes through self.lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS mirrored_playlists (
+                playlist_id TEXT PRIMARY KEY,
+                snapshot_id TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                first_position INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                playlist_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                track_id TEXT,
+                name TEXT,
+                added_at INTEGER NOT NULL,
+                added_by TEXT,
+                duration_ms INTEGER,
+                artist_ids TEXT,
+                PRIMARY KEY (playlist_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS items_added_at ON items (playlist_id, added_at);
+        """)
+        
+        # Copies made before durations and artists were kept get the columns
+        # added, and leave them empty for MetadataCache to fill in
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(items)")}
+        for column, column_type in (("duration_ms", "INTEGER"), ("artist_ids", "TEXT")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE items ADD COLUMN {column} {column_type}")
+        
+        # Jobs sharing a source playlist take turns syncing it
+        self._sync_locks = {}
+    
+    def _sync_lock(self, playlist_id):
+        with self.lock:
+            return self._sync_locks.setdefault(playlist_id, threading.Lock())
+    
+    def _mirrored(self, playlist_id):
+        """Return (snapshot_id, total, first_position) of a playlist's copy, or None."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT snapshot_id, total, first_position FROM mirrored_playlists WHERE playlist_id = ?",
+                (playlist_id,)
+            ).fetchone()
+    
+    def _item_at(self, playlist_id, position):
+        """Return (track_id, added_at) of the mirrored item at a position, or None."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT track_id, added_at FROM items WHERE playlist_id = ? AND position = ?",
+                (playlist_id, position)
+            ).fetchone()
+    
+    def _store(self, playlist_id, offset, items):
+        """Record a page of raw playlist items starting at the given position and return its Tracks."""
+        rows = []
+        for position, item in enumerate(items, offset):
+            # Local files have no Spotify ID and unavailable items no track, but both keep their position
+            track = item["track"] or {}
+            added_by = item.get("added_by") or {}
+            artist_ids = ",".join(artist["id"] for artist in track.get("artists") or [] if artist.get("id"))
+            rows.append((
+                playlist_id, position, track.get("id"), track.get("name"),
+                parse_timestamp(item["added_at"]), added_by.get("id"),
+                track.get("duration_ms"), artist_ids if track.get("id") else None
+            ))
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO items "
+                "(playlist_id, position, track_id, name, added_at, added_by, duration_ms, artist_ids) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return [Track(row[2], row[3], row[4]) for row in rows if row[2]]
+    
+    def _set_mirrored(self, playlist_id, snapshot_id, total, first_position, reset=False):
+        with self.lock, self.conn:
+            if reset:
+                self.conn.execute("DELETE FROM items WHERE playlist_id = ?", (playlist_id,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO mirrored_playlists (playlist_id, snapshot_id, total, first_position) "
+                "VALUES (?, ?, ?, ?)",
+                (playlist_id, snapshot_id, total, first_position)
+            )
+    
+    def _read_appended(self, sp, playlist_id, known_total):
+        """
+        Read the items appended since the copy was made, if that's all that changed.
+        
+        The first page read holds the last item we have, so it also tells us
+        whether that item is still where it was. Returns False if it isn't.
+        Items moved around before it go unnoticed.
+        """
+        last_item = self._item_at(playlist_id, known_total - 1) if known_total else None
+        if last_item is None:
+            return False
+        
+        limit = 100
+        offset = (known_total - 1) // limit * limit
+        results = fetch_playlist_page(sp, playlist_id, offset, limit)
+        items = results["items"]
+        index = known_total - 1 - offset
+        if len(items) <= index or (items[index]["track"] or {}).get("id") != last_item[0] \
+                or parse_timestamp(items[index]["added_at"]) != last_item[1]:
+            return False
+        
+        while True:
+            self._store(playlist_id, offset, items)
+            if results["next"] is None:
+                return True
+            offset += limit
+            results = fetch_playlist_page(sp, playlist_id, offset, limit)
+            items = results["items"]
+    
+    def _read_older(self, sp, playlist_id, total, first_position, concurrency=None):
+        """Read everything before first_position, several pages at once, yielding each page's Tracks in order."""
+        if is_saved_tracks(playlist_id):
+            # Liked Songs before first_position are the ones furthest from the start of the API's list
+            fetch = lambda offset: fetch_saved_tracks_page(sp, offset)
+            for offset, page in iter_pages(fetch, reversed(range(total - first_position, total, 50)), concurrency):
+                yield self._store_saved(playlist_id, total, offset, page["items"])
+            return
+        
+        for offset, page in iter_playlist_pages(sp, playlist_id, range(0, first_position, 100), concurrency):
+            yield self._store(playlist_id, offset, page["items"])
+    
+    def _read_back(self, sp, playlist_id, total, first_position, since, concurrency=None):
+        """
+        Extend a copy backwards from first_position and return its new first position.
+        
+        With since=None everything before first_position is read, several
+        pages at once. Otherwise pages are read one at a time going backwards
+        until one starts with an item added before since. Playlist pages
+        always start at a multiple of 100, so the same page has the same URL
+        from run to run and can be revalidated by the ResponseCache.
+        """
+        if since is None:
+            for _ in self._read_older(sp, playlist_id, total, first_position, concurrency):
+                pass
+            return 0
+        
+        if is_saved_tracks(playlist_id):
+            while first_position > 0:
+                oldest = self._item_at(playlist_id, first_position)
+                if oldest is not None and oldest[1] < since:
+                    break
+                results = fetch_saved_tracks_page(sp, total - first_position)
+                if not results["items"]:
+                    break
+                self._store_saved(playlist_id, total, total - first_position, results["items"])
+                first_position -= len(results["items"])
+            return max(first_position, 0)
+        
+        limit = 100
+        while first_position > 0:
+            oldest = self._item_at(playlist_id, first_position)
+            if oldest is not None and oldest[1] < since:
+                break
+            offset = (first_position - 1) // limit * limit
+            results = fetch_playlist_page(sp, playlist_id, offset, limit)
+            self._store(playlist_id, offset, results["items"])
+            first_position = offset
+        return first_position
+    
+    def sync(self, sp, playlist_id, since=None, full=False):
+        """
+        Bring the copy of a playlist up to date and return its snapshot_id.
+        
+        Args:
+            sp: Spotify client
+            playlist_id: Playlist to mirror
+            since: Make sure every item added at or after this time, in UTC
+                epoch seconds, is mirrored (defaults to the whole playlist)
+            full: Discard the copy and read the playlist again
+        """
+        with self._sync_lock(playlist_id):
+            snapshot_id, total, first_position = self._refresh(sp, playlist_id, full)
+            new_first_position = self._read_back(sp, playlist_id, total, first_position, since)
+            self._set_mirrored(playlist_id, snapshot_id, total, new_first_position)
+        return snapshot_id
+    
+    def stream(self, sp, playlist_id, chunk_size=500, full=False):
+        """
+        Bring the copy of a whole playlist up to date, yielding its tracks in playlist order.
+        
+        Tracks come in lists of up to chunk_size. The part of the playlist
+        that has to be read from Spotify is yielded page by page as it
+        arrives, so the caller can start on it while the rest is still being
+        read; the part already mirrored is read back from SQLite. Only one
+        chunk is held in memory at a time. With full, the copy is discarded
+        and the whole playlist streamed from Spotify.
+        """
+        with self._sync_lock(playlist_id):
+            snapshot_id, total, first_position = self._refresh(sp, playlist_id, full)
+            yield from self._read_older(sp, playlist_id, total, first_position)
+            self._set_mirrored(playlist_id, snapshot_id, total, 0)
+            
+            position = min(first_position, total) - 1
+            while True:
+                with self.lock:
+                    rows = self.conn.execute(
+                        "SELECT position, track_id, name, added_at FROM items "
+                        "WHERE playlist_id = ? AND position > ? ORDER BY position LIMIT ?",
+                        (playlist_id, position, chunk_size)
+                    ).fetchall()
+                if not rows:
+                    return
+                position = rows[-1][0]
+                yield [Track(track_id, name, added_at) for _, track_id, name, added_at in rows if track_id]
+    
+    def _refresh(self, sp, playlist_id, full=False):
+        """
+        Bring the newest part of a copy up to date, as described in the class docstring.
+        
+        Returns (snapshot_id, total, first position of the copy).
+        """
+        if is_saved_tracks(playlist_id):
+            return self._refresh_saved(sp, playlist_id, full)
+        
+        snapshot_id, total = get_playlist_snapshot(sp, playlist_id)
+        mirrored = None if full else self._mirrored(playlist_id)
+        
+        if mirrored and mirrored[0] == snapshot_id:
+            return snapshot_id, total, mirrored[2]
+        if mirrored and total >= mirrored[1] and self._read_appended(sp, playlist_id, mirrored[1]):
+            logger.debug(f"Mirrored {total - mirrored[1]} new items of playlist {playlist_id}")
+            self._set_mirrored(playlist_id, snapshot_id, total, mirrored[2])
+            return snapshot_id, total, mirrored[2]
+        
+        # Start over with an empty copy that reaches back to the end of the playlist
+        if mirrored:
+            logger.info(f"Playlist {playlist_id} changed beyond new additions, reading it again")
+        self._set_mirrored(playlist_id, snapshot_id, total, total, reset=True)
+        return snapshot_id, total, total
+    
+    def _store_saved(self, playlist_id, total, offset, items):
+        """Record a page of Liked Songs read at the given offset of the API's newest-first list."""
+        return self._store(playlist_id, total - offset - len(items), items[::-1])
+    
+    def _refresh_saved(self, sp, playlist_id, full=False):
+        """
+        Bring the newest part of a copy of Liked Songs up to date.
+        
+        Liked Songs have no snapshot_id, so the first page stands in for the
+        metadata request: their total and newest like make up the snapshot.
+        New likes come first, so if the newest like we have is now just past
+        them, only the pages up to it are read.
+        """
+        limit = 50
+        results = fetch_saved_tracks_page(sp, 0, limit)
+        total = results["total"]
+        snapshot_id = "0"
+        if results["items"]:
+            newest = results["items"][0]
+            snapshot_id = f"{total}:{(newest['track'] or {}).get('id')}:{newest['added_at']}"
+        mirrored = None if full else self._mirrored(playlist_id)
+        
+        if mirrored and mirrored[0] == snapshot_id:
+            return snapshot_id, total, mirrored[2]
+        if mirrored and mirrored[1] and total >= mirrored[1]:
+            new_likes = total - mirrored[1]
+            last_item = self._item_at(playlist_id, mirrored[1] - 1)
+            pages = [(0, results)]
+            fetch = lambda offset: fetch_saved_tracks_page(sp, offset, limit)
+            pages.extend(iter_pages(fetch, range(limit, new_likes // limit * limit + 1, limit)))
+            
+            offset, page = pages[-1]
+            items = page["items"]
+            index = new_likes - offset
+            if last_item and index < len(items) and (items[index]["track"] or {}).get("id") == last_item[0] \
+                    and parse_timestamp(items[index]["added_at"]) == last_item[1]:
+                for offset, page in pages:
+                    self._store_saved(playlist_id, total, offset, page["items"][:max(new_likes - offset, 0)])
+                logger.debug(f"Mirrored {new_likes} new liked songs")
+                self._set_mirrored(playlist_id, snapshot_id, total, mirrored[2])
+                return snapshot_id, total, mirrored[2]
+        
+        # Start over with a copy of just the first page
+        if mirrored:
+            logger.info("Liked Songs changed beyond new likes, reading them again")
+        first_position = total - len(results["items"])
+        self._set_mirrored(playlist_id, snapshot_id, total, first_position, reset=True)
+        self._store_saved(playlist_id, total, 0, results["items"])
+        return snapshot_id, total, first_position
+    
+    def tracks(self, playlist_id, start=None, end=None, newest_first=False, limit=None):
+        """
+        Return the mirrored tracks added in [start, end), in the order they were added.
+        
+        Args:
+            playlist_id: Mirrored playlist
+            start: Earliest added_at to include, in UTC epoch seconds (defaults to no limit)
+            end: added_at to stop before, in UTC epoch seconds (defaults to no limit)
+            newest_first: Return the most recently added tracks first
+            limit: Return at most this many tracks
+        """
+        query = "SELECT track_id, name, added_at FROM items WHERE playlist_id = ? AND track_id IS NOT NULL"
+        params = [playlist_id]
+        if start is not None:
+            query += " AND added_at >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND added_at < ?"
+            params.append(end)
+        query += " ORDER BY added_at DESC, position" if newest_first else " ORDER BY added_at, position"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [Track(track_id, name, added_at) for track_id, name, added_at in rows]
+    
+    def track_details(self, playlist_id, start=None, end=None):
+        """
+        Return the mirrored tracks added in [start, end) with everything known about them.
+        
+        Each track is only returned once, where it was first added, as a dict
+        with its track_id, added_at, added_by, duration_ms and artist_ids.
+        The last two are None for items mirrored before they were kept.
+        """
+        query = (
+            "SELECT track_id, added_at, added_by, duration_ms, artist_ids FROM items "
+            "WHERE playlist_id = ? AND track_id IS NOT NULL"
+        )
+        params = [playlist_id]
+        if start is not None:
+            query += " AND added_at >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND added_at < ?"
+            params.append(end)
+        query += " ORDER BY added_at, position"
+        
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        
+        details = {}
+        for track_id, added_at, added_by, duration_ms, artist_ids in rows:
+            if track_id not in details:
+                details[track_id] = {
+                    "track_id": track_id,
+                    "added_at": added_at,
+                    "added_by": added_by,
+                    "duration_ms": duration_ms,
+                    "artist_ids": None if artist_ids is None else [
+                        artist_id for artist_id in artist_ids.split(",") if artist_id
+                    ]
+                }
+        return list(details.values())
+    
+    def first_positions(self, playlist_id, start=None, end=None):
+        """Return each mirrored track's first position among the items added in [start, end), by track ID."""
+        query = "SELECT track_id, MIN(position) FROM items WHERE playlist_id = ? AND track_id IS NOT NULL"
+        params = [playlist_id]
+        if start is not None:
+            query += " AND added_at >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND added_at < ?"
+            params.append(end)
+        query += " GROUP BY track_id"
+        
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return dict(rows)
+    
+    def first_added(self, playlist_id):
+        """Return when each mirrored track was first added, in UTC epoch seconds, by track ID."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT track_id, MIN(added_at) FROM items WHERE playlist_id = ? AND track_id IS NOT NULL "
+                "GROUP BY track_id",
+                (playlist_id,)
+            ).fetchall()
+        return dict(rows)
+    
+    def first_added_at(self, playlist_id):
+        """Return when the oldest mirrored track was added, in UTC epoch seconds, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MIN(added_at) FROM items WHERE playlist_id = ? AND track_id IS NOT NULL", (playlist_id,)
+            ).fetchone()
+        return row[0]
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class MetadataCache:
+    """
+    Track and artist metadata from the API, cached in SQLite.
+    
+    IDs are looked up with the batch endpoints, 50 per call, and only if
+    they aren't cached yet or their entry is older than ttl seconds, so
+    after the first report each ID is normally fetched once.
+    """
+    
+    def __init__(self, path=METADATA_CACHE_PATH, ttl=METADATA_TTL):
+        import sqlite3
+        
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS metadata (
+                kind TEXT NOT NULL,
+                id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (kind, id)
+            );
+        """)
+    
+    def _lookup(self, sp, kind, ids, fetch):
+        """
+        Return cached or freshly fetched metadata for the given IDs, by ID.
+        
+        Args:
+            sp: Spotify client
+            kind: Which kind of metadata ("tracks" or "artists")
+            ids: IDs to look up
+            fetch: Function taking the client and up to 50 IDs and returning
+                their metadata dicts, with None for unknown IDs
+        """
+        ids = list(dict.fromkeys(ids))
+        fresh_after = time.time() - self.ttl
+        found = {}
+        with self.lock:
+            # SQLite limits the number of parameters, so look the IDs up in chunks
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i+500]
+                rows = self.conn.execute(
+                    f"SELECT id, data FROM metadata WHERE kind = ? AND fetched_at >= ? "
+                    f"AND id IN ({','.join('?' * len(chunk))})",
+                    [kind, fresh_after, *chunk]
+                ).fetchall()
+                found.update((metadata_id, json.loads(data)) for metadata_id, data in rows)
+        
+        missing = [metadata_id for metadata_id in ids if metadata_id not in found]
+        for i in range(0, len(missing), 50):
+            batch = missing[i:i+50]
+            fetched = {metadata_id: data for metadata_id, data in zip(batch, fetch(sp, batch)) if data}
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO metadata (kind, id, data, fetched_at) VALUES (?, ?, ?, ?)",
+                    [(kind, metadata_id, json.dumps(data), time.time()) for metadata_id, data in fetched.items()]
+                )
+            found.update(fetched)
+        if missing:
+            logger.debug(f"Fetched {kind} metadata for {len(missing)} IDs")
+        return found
+    
+    def tracks(self, sp, track_ids):
+        """Return {"duration_ms", "artist_ids"} for each track ID."""
+        def fetch(sp, batch):
+            return [
+                {"duration_ms": track["duration_ms"], "artist_ids": [artist["id"] for artist in track["artists"]]}
+                if track else None
+                for track in sp.tracks(batch)["tracks"]
+            ]
+        return self._lookup(sp, "tracks", track_ids, fetch)
+    
+    def artists(self, sp, artist_ids):
+        """Return {"name", "genres"} for each artist ID."""
+        def fetch(sp, batch):
+            return [
+                {"name": artist["name"], "genres": artist["genres"]} if artist else None
+                for artist in sp.artists(batch)["artists"]
+            ]
+        return self._lookup(sp, "artists", artist_ids, fetch)
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def get_playlist_positions(sp, playlist_id, concurrency=None):
+    """
+    Get a playlist's snapshot_id and the track ID at every position.
+    
+    Local files and unavailable items have None as their track ID, so list
+    indexes are the playlist's positions. Several pages are fetched at once.
+    """
+    snapshot_id, total = get_playlist_snapshot(sp, playlist_id)
+    
+    track_ids = []
+    for _, page in iter_playlist_pages(sp, playlist_id, range(0, total, 100), concurrency):
+        track_ids.extend((item["track"] or {}).get("id") for item in page["items"])
+    return snapshot_id, track_ids
+
+def load_sync_state():
+    """Load the per-playlist sync state saved by the previous run."""
+    try:
+        with open(SYNC_STATE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable sync state {SYNC_STATE_PATH}: {e}")
+        return {}
+
+def save_sync_state(state):
+    """Persist the per-playlist sync state for the next run."""
+    # Write to a temporary file first so an interrupted run can't corrupt the state
+    write_file_atomically(SYNC_STATE_PATH, json.dumps(state, indent=2))
+
+# Jobs running side by side share the sync state file
+_sync_state_lock = threading.Lock()
+
+def update_sync_state(changes):
+    """Merge the given entries into the saved sync state without losing other jobs' updates."""
+    with _sync_state_lock:
+        state = load_sync_state()
+        state.update(changes)
+        save_sync_state(state)
+
+def job_state_key(job):
+    """
+    Sync state key of a job's source playlist for one of its period schemes.
+    
+    Jobs can share a source, so it includes the job name, and every scheme
+    other than seasons keeps its own state.
+    """
+    key = f"{job['name']}:{job['source']}"
+    scheme = job.get("scheme")
+    if scheme and scheme["name"] != "season":
+        key += f":{scheme['name']}"
+    return key
+
+# Ledger files whose interrupted batches have been recovered in this process
+_recovered_ledgers = set()
+_recovered_ledgers_lock = threading.Lock()
+
+class AddLedger:
+    """
+    Write-ahead ledger of the tracks added to each playlist, stored in SQLite.
+    
+    Each playlist_add_items batch is recorded as pending before it is sent and
+    marked committed once Spotify confirms it, so an interrupted run can resume
+    from the last committed batch. A playlist is "seeded" once its remote
+    contents have been read into the ledger; after that, membership checks are
+    answered locally. If a run died with a batch still pending we can't know
+    whether it landed, so that playlist is read from Spotify again; the same
+    goes for a batch whose request failed. One ledger file can be opened
+    several times in a process, e.g. by concurrent jobs, and only the first
+    open looks for pending batches.
+    """
+    
+    def __init__(self, path=LEDGER_PATH):
+        import sqlite3
+        
+        # Shared between season workers, so every use goes through self.lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS playlists (
+                playlist_id TEXT PRIMARY KEY,
+                seeded INTEGER NOT NULL DEFAULT 0,
+                snapshot_id TEXT
+            );
+            CREATE TABLE IF NOT EXISTS batches (
+                playlist_id TEXT NOT NULL,
+                batch_no INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                track_ids TEXT NOT NULL,
+                snapshot_id TEXT,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (playlist_id, batch_no)
+            );
+            CREATE TABLE IF NOT EXISTS tracks (
+                playlist_id TEXT NOT NULL,
+                track_id TEXT NOT NULL,
+                batch_no INTEGER NOT NULL,
+                PRIMARY KEY (playlist_id, track_id)
+            );
+        """)
+        
+        # Batches left pending by an interrupted run may or may not have landed.
+        # Only check once per process: later pending batches belong to writes
+        # still in flight in this run.
+        with _recovered_ledgers_lock:
+            recover = os.path.abspath(path) not in _recovered_ledgers
+            _recovered_ledgers.add(os.path.abspath(path))
+        if recover:
+            with self.conn:
+                pending = self.conn.execute(
+                    "SELECT DISTINCT playlist_id FROM batches WHERE status = 'pending'"
+                ).fetchall()
+                for (playlist_id,) in pending:
+                    logger.warning(f"Found an unconfirmed batch for playlist {playlist_id}, it will be re-read")
+                    self.conn.execute("UPDATE playlists SET seeded = 0 WHERE playlist_id = ?", (playlist_id,))
+                self.conn.execute("DELETE FROM batches WHERE status = 'pending'")
+        
+        # Cache of playlist_id -> set of track IDs for O(1) membership checks
+        self._track_ids = {}
+    
+    def is_seeded(self, playlist_id):
+        """Check whether the playlist's remote contents have been recorded."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT seeded FROM playlists WHERE playlist_id = ?", (playlist_id,)
+            ).fetchone()
+        return bool(row and row[0])
+    
+    def seed(self, playlist_id, track_ids):
+        """Record the tracks already in a playlist, as read from Spotify."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tracks (playlist_id, track_id, batch_no) VALUES (?, ?, 0)",
+                [(playlist_id, track_id) for track_id in track_ids]
+            )
+            self.conn.execute(
+                "INSERT INTO playlists (playlist_id, seeded) VALUES (?, 1) "
+                "ON CONFLICT(playlist_id) DO UPDATE SET seeded = 1",
+                (playlist_id,)
+            )
+            self._track_ids.pop(playlist_id, None)
+    
+    def track_ids(self, playlist_id):
+        """Return the set of track IDs recorded for a playlist."""
+        with self.lock:
+            if playlist_id not in self._track_ids:
+                rows = self.conn.execute(
+                    "SELECT track_id FROM tracks WHERE playlist_id = ?", (playlist_id,)
+                ).fetchall()
+                self._track_ids[playlist_id] = {track_id for (track_id,) in rows}
+            return self._track_ids[playlist_id]
+    
+    def begin_batch(self, playlist_id, track_ids):
+        """Record a batch as pending before sending it and return its batch number."""
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT COALESCE(MAX(batch_no), 0) FROM batches WHERE playlist_id = ?", (playlist_id,)
+            ).fetchone()
+            batch_no = row[0] + 1
+            self.conn.execute(
+                "INSERT INTO batches (playlist_id, batch_no, status, track_ids, created_at) "
+                "VALUES (?, ?, 'pending', ?, ?)",
+                (playlist_id, batch_no, json.dumps(track_ids), datetime.now().isoformat())
+            )
+        return batch_no
+    
+    def commit_batch(self, playlist_id, batch_no, track_ids, snapshot_id):
+        """Mark a batch as confirmed by Spotify and record its tracks."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE batches SET status = 'committed', snapshot_id = ? WHERE playlist_id = ? AND batch_no = ?",
+                (snapshot_id, playlist_id, batch_no)
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tracks (playlist_id, track_id, batch_no) VALUES (?, ?, ?)",
+                [(playlist_id, track_id, batch_no) for track_id in track_ids]
+            )
+            self.conn.execute(
+                "INSERT INTO playlists (playlist_id, snapshot_id) VALUES (?, ?) "
+                "ON CONFLICT(playlist_id) DO UPDATE SET snapshot_id = excluded.snapshot_id",
+                (playlist_id, snapshot_id)
+            )
+            if playlist_id in self._track_ids:
+                self._track_ids[playlist_id].update(track_ids)
+    
+    def abandon_batch(self, playlist_id, batch_no):
+        """Drop a batch whose request failed; it may have landed, so the playlist is read from Spotify again."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM batches WHERE playlist_id = ? AND batch_no = ?", (playlist_id, batch_no))
+            self.conn.execute("UPDATE playlists SET seeded = 0 WHERE playlist_id = ?", (playlist_id,))
+            self._track_ids.pop(playlist_id, None)
+    
+    def release(self, playlist_id):
+        """Drop the in-memory set of a playlist's track IDs; track_ids reads it back from the file."""
+        with self.lock:
+            self._track_ids.pop(playlist_id, None)
+    
+    def discard(self, playlist_id, track_ids):
+        """Forget tracks that were removed from a playlist."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM tracks WHERE playlist_id = ? AND track_id = ?",
+                [(playlist_id, track_id) for track_id in track_ids]
+            )
+            if playlist_id in self._track_ids:
+                self._track_ids[playlist_id].difference_update(track_ids)
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def add_tracks_to_playlist(sp, playlist_id, track_ids, ledger=None):
+    """
+    Add tracks to a playlist in batches, recording each batch in the ledger.
+    
+    Returns the playlist's snapshot_id after the last batch, or None if there
+    was nothing to add.
+    """
+    snapshot_id = None
+    
+    # Spotify has a limit of 100 tracks per request
+    for i in range(0, len(track_ids), 100):
+        batch = track_ids[i:i+100]
+        
+        batch_no = ledger.begin_batch(playlist_id, batch) if ledger else None
+        try:
+            result = sp.playlist_add_items(playlist_id, [f"spotify:track:{track_id}" for track_id in batch])
+        except Exception:
+            if ledger:
+                ledger.abandon_batch(playlist_id, batch_no)
+            raise
+        snapshot_id = result["snapshot_id"]
+        if ledger:
+            ledger.commit_batch(playlist_id, batch_no, batch, snapshot_id)
+    
+    return snapshot_id
+
+def create_seasonal_playlist(sp, season, year, job, ledger):
+    """Find or create the playlist for a season that has none yet, and return its ID."""
+    playlist_id = find_or_create_seasonal_playlist(sp, season, year, job)
+    # A new playlist starts out empty, so later runs needn't read it back
+    if not ledger.is_seeded(playlist_id):
+        ledger.seed(playlist_id, [])
+    return playlist_id
+
+def new_plan(job):
+    """
+    Start an empty plan of additions to a job's seasonal playlists.
+    
+    A plan is plain JSON-serializable data: the job, and for each seasonal
+    playlist by name its season, year, ID (None if it has to be created) and
+    the IDs of the tracks to add, in order.
+    """
+    return {"job": job, "playlists": {}}
+
+def plan_additions(plan, season, year, playlist_id, existing_track_ids, tracks):
+    """
+    Plan adding the tracks a seasonal playlist is missing.
+    
+    Each track is planned once, in the order given, even if it appears
+    several times in the main playlist or is planned for the same playlist
+    more than once.
+    
+    Args:
+        plan: Plan from new_plan
+        season: Season of the playlist
+        year: Year of the playlist
+        playlist_id: The playlist's ID, or None if it still has to be created
+        existing_track_ids: Set of the IDs already in the playlist
+        tracks: Tracks that belong in the playlist
+        
+    Returns:
+        The track IDs planned for the playlist
+    """
+    name = plan["job"]["name_template"].format(season=season, period=season, year=year)
+    entry = plan["playlists"].setdefault(name, {
+        "season": season,
+        "year": year,
+        "playlist_id": playlist_id,
+        "tracks": []
+    })
+    
+    planned = set(entry["tracks"])
+    for track in tracks:
+        if track.id not in existing_track_ids and track.id not in planned:
+            planned.add(track.id)
+            entry["tracks"].append(track.id)
+    return entry["tracks"]
+
+def longest_increasing_subsequence(values):
+    """Return the set of values on a longest strictly increasing subsequence, in O(n log n)."""
+    # tails[k] is the smallest value ending an increasing run of length k + 1
+    tails = []
+    tail_indexes = []
+    previous = [None] * len(values)
+    for i, value in enumerate(values):
+        k = bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_indexes.append(i)
+        else:
+            tails[k] = value
+            tail_indexes[k] = i
+        previous[i] = tail_indexes[k - 1] if k else None
+    
+    result = set()
+    i = tail_indexes[-1] if tail_indexes else None
+    while i is not None:
+        result.add(values[i])
+        i = previous[i]
+    return result
+
+def plan_moves(ranks):
+    """
+    Plan the playlist_reorder_items calls that put a playlist's items in order.
+    
+    The items on a longest increasing run of ranks are already in order
+    relative to each other, so only the others are moved, each to just
+    before the item ranked after it, highest rank first. Items next to each
+    other in both the playlist and the wanted order move together as one
+    range. Planning takes O(n log n) for n items.
+    
+    Args:
+        ranks: Each item's rank in the wanted order, by position, or None
+            for items that stay where they are (local files)
+    
+    Returns:
+        A list of [range_start, insert_before, range_length] to apply in order
+    """
+    ranked = [(position, rank) for position, rank in enumerate(ranks) if rank is not None]
+    in_order = longest_increasing_subsequence([rank for _, rank in ranked])
+    position_of = {rank: position for position, rank in ranked}
+    present = sorted(position_of)
+    next_rank = dict(zip(present, present[1:]))
+    
+    groups = []
+    for rank in present:
+        if rank in in_order:
+            continue
+        previous = groups[-1][-1] if groups else None
+        if previous is not None and next_rank[previous] == rank and position_of[rank] == position_of[previous] + 1:
+            groups[-1].append(rank)
+        else:
+            groups.append([rank])
+    
+    # Every item has a slot where it starts, and every moved item a second one
+    # just before the item it moves in front of. Laying all the slots out in
+    # one linked list first gives them a fixed order, so a Fenwick tree over
+    # the slots in use can tell where an item is at any point of the replay
+    # in O(log n), instead of searching and shifting a list for every move.
+    if not groups:
+        return []
+    n = len(ranks)
+    end = n + len(present)
+    new_slot = {rank: n + i for i, rank in enumerate(present)}
+    following = [end] * (end + 1)
+    preceding = [end] * (end + 1)
+    for slot in range(n):
+        following[preceding[end]] = slot
+        preceding[slot] = preceding[end]
+        preceding[end] = slot
+    following[preceding[end]] = end
+    slot_of = dict(position_of)
+    for group in reversed(groups):
+        successor = next_rank.get(group[-1])
+        anchor = slot_of[successor] if successor is not None else end
+        for rank in group:
+            slot = new_slot[rank]
+            preceding[slot], following[slot] = preceding[anchor], anchor
+            following[preceding[anchor]] = slot
+            preceding[anchor] = slot
+            slot_of[rank] = slot
+    
+    index = [0] * end
+    slot, i = following[end], 0
+    while slot != end:
+        index[slot] = i
+        slot, i = following[slot], i + 1
+    
+    tree = [0] * (end + 1)
+    
+    def update(slot, delta):
+        i = index[slot] + 1
+        while i <= end:
+            tree[i] += delta
+            i += i & -i
+    
+    def position(slot):
+        # Number of slots in use before this one
+        i, count = index[slot], 0
+        while i > 0:
+            count += tree[i]
+            i -= i & -i
+        return count
+    
+    for slot in range(n):
+        update(slot, 1)
+    
+    # Replay the moves to know where each group is by the time it moves
+    slot_of = dict(position_of)
+    moves = []
+    for group in reversed(groups):
+        start = position(slot_of[group[0]])
+        length = len(group)
+        successor = next_rank.get(group[-1])
+        before = position(slot_of[successor]) if successor is not None else n
+        if before not in (start, start + length):
+            moves.append([start, before, length])
+        # Already in place or not, the group now sits in its new slots,
+        # which come in the same order among the slots in use
+        for rank in group:
+            update(slot_of[rank], -1)
+            slot_of[rank] = new_slot[rank]
+            update(slot_of[rank], 1)
+    return moves
+
+def plan_reconciliation(plan, season, year, playlist_id, snapshot_id, playlist_track_ids, tracks):
+    """
+    Plan making a seasonal playlist match its slice of the main playlist.
+    
+    Tracks that aren't in the slice, and repeats of a track, are removed,
+    the missing ones are planned as additions at the end, and then
+    everything is reordered into the slice's order with plan_moves, so the
+    added tracks end up in their place in one run. Local files are left
+    alone. The removals and moves are planned against snapshot_id and are
+    skipped when applying the plan if the playlist changed in between.
+    
+    Args:
+        plan: Plan from new_plan
+        season: Season of the playlist
+        year: Year of the playlist
+        playlist_id: The playlist's ID
+        snapshot_id: The playlist's snapshot_id when playlist_track_ids was read
+        playlist_track_ids: The playlist's track IDs by position, None for local files
+        tracks: Tracks that belong in the playlist, in the order they should be in
+        
+    Returns:
+        The plan entry of the playlist
+    """
+    wanted = {}
+    for track in tracks:
+        wanted.setdefault(track.id, len(wanted))
+    
+    # Removals go from the last position back, so the positions still to go don't shift
+    remove = []
+    kept = set()
+    ranks = []
+    for position, track_id in enumerate(playlist_track_ids):
+        if track_id is None:
+            ranks.append(None)
+        elif track_id in wanted and track_id not in kept:
+            kept.add(track_id)
+            ranks.append(wanted[track_id])
+        else:
+            remove.append([position, track_id])
+    remove.reverse()
+    
+    plan_additions(plan, season, year, playlist_id, kept, tracks)
+    entry = plan["playlists"][plan["job"]["name_template"].format(season=season, period=season, year=year)]
+    ranks.extend(wanted[track_id] for track_id in entry["tracks"])
+    entry["base_snapshot_id"] = snapshot_id
+    entry["remove"] = remove
+    entry["dropped"] = list(dict.fromkeys(track_id for _, track_id in remove if track_id not in kept))
+    entry["moves"] = plan_moves(ranks)
+    return entry
+
+def has_changes(entry):
+    """Check whether applying a plan entry writes anything."""
+    return bool(entry["tracks"] or entry.get("remove") or entry.get("moves"))
+
+def count_plan_writes(plan):
+    """Return the number of write calls applying a plan takes."""
+    writes = 0
+    for entry in plan["playlists"].values():
+        if entry["tracks"]:
+            # Two calls to create and share the playlist if needed, then one per 100 tracks
+            writes += 2 * (entry["playlist_id"] is None) + -(-len(entry["tracks"]) // 100)
+        # One call per 100 removals and one per move
+        writes += -(-len(entry.get("remove", [])) // 100) + len(entry.get("moves", []))
+    return writes
+
+def describe_plan(plan):
+    """Log what applying a plan would change."""
+    changes = {name: entry for name, entry in plan["playlists"].items() if has_changes(entry)}
+    for name, entry in changes.items():
+        target = "new playlist" if entry["playlist_id"] is None else entry["playlist_id"]
+        summary = f"add {len(entry['tracks'])} tracks"
+        if "remove" in entry:
+            summary += f", remove {len(entry['remove'])}, make {len(entry['moves'])} moves"
+        logger.info(f"  {name} ({target}): {summary}")
+    
+    removals = sum(len(entry.get("remove", [])) for entry in changes.values())
+    label = plan["job"]["name"]
+    scheme = plan["job"].get("scheme")
+    if scheme and scheme["name"] != "season":
+        label += f" ({scheme['name']})"
+    logger.info(
+        f"Plan for {label}: add {sum(len(entry['tracks']) for entry in changes.values())} tracks "
+        + (f"and remove {removals} " if removals else "")
+        + f"in {len(changes)} playlists ({len(plan['playlists']) - len(changes)} up to date), "
+        f"{count_plan_writes(plan)} write calls"
+    )
+
+def write_plans(plans, path):
+    """Save plans as JSON, e.g. to review what a --dry-run would do."""
+    write_file_atomically(path, json.dumps({"plans": plans}, indent=2))
+    logger.info(f"Wrote plan to {path}")
+
+def apply_reconciliation(sp, entry, ledger=None):
+    """
+    Apply a plan entry from plan_reconciliation: removals, then additions, then moves.
+    
+    The playlist's snapshot_id is checked first, and only the additions are
+    made if it moved on since the plan was made, since the planned positions
+    would no longer be right. Every removal and move is made against the
+    snapshot_id returned by the call before, so Spotify can tell if someone
+    else edits the playlist in the meantime.
+    
+    Returns:
+        The playlist's snapshot_id afterwards
+    """
+    playlist_id = entry["playlist_id"]
+    snapshot_id, _ = get_playlist_snapshot(sp, playlist_id)
+    if snapshot_id != entry["base_snapshot_id"]:
+        logger.warning(
+            f"{entry['season']} {entry['year']} playlist changed since it was planned, "
+            f"skipping its removals and moves; run again to reconcile it"
+        )
+        if entry["tracks"]:
+            snapshot_id = add_tracks_to_playlist(sp, playlist_id, entry["tracks"], ledger)
+        return snapshot_id
+    
+    # Spotify takes up to 100 items per removal
+    remove = entry["remove"]
+    for i in range(0, len(remove), 100):
+        items = [
+            {"uri": f"spotify:track:{track_id}", "positions": [position]} for position, track_id in remove[i:i+100]
+        ]
+        result = sp.playlist_remove_specific_occurrences_of_items(playlist_id, items, snapshot_id)
+        snapshot_id = result["snapshot_id"]
+    if remove:
+        if ledger:
+            ledger.discard(playlist_id, entry["dropped"])
+        logger.info(f"Removed {len(remove)} tracks from {entry['season']} {entry['year']} playlist")
+    
+    # The moves put the added tracks in place too, so they have to come after them
+    if entry["tracks"]:
+        snapshot_id = add_tracks_to_playlist(sp, playlist_id, entry["tracks"], ledger)
+    
+    for range_start, insert_before, range_length in entry["moves"]:
+        result = sp.playlist_reorder_items(playlist_id, range_start, insert_before, range_length, snapshot_id)
+        snapshot_id = result["snapshot_id"]
+    if entry["moves"]:
+        logger.info(f"Made {len(entry['moves'])} moves in {entry['season']} {entry['year']} playlist")
+    
+    return snapshot_id
+
+def apply_plan(sp, plan, ledger=None, workers=None):
+    """
+    Create the planned playlists that don't exist yet and add their tracks.
+    
+    Each playlist's tracks go out in as few 100-track batches as possible,
+    between any planned removals and moves (see apply_reconciliation). Several
+    playlists are written at once, each by a single worker so its tracks
+    keep their order. Every applied entry gets its playlist_id and
+    snapshot_id filled in.
+    
+    Args:
+        sp: Spotify client
+        plan: Plan from new_plan
+        ledger: AddLedger to record writes in (defaults to opening LEDGER_PATH)
+        workers: Number of playlists written at once (defaults to SEASON_WORKERS)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    entries = [entry for entry in plan["playlists"].values() if has_changes(entry)]
+    if not entries:
+        return
+    if workers is None:
+        workers = SEASON_WORKERS
+    
+    def apply_entry(entry):
+        with METRICS.phase("writes"):
+            if entry["playlist_id"] is None:
+                entry["playlist_id"] = create_seasonal_playlist(sp, entry["season"], entry["year"], plan["job"], ledger)
+            if entry.get("remove") or entry.get("moves"):
+                entry["snapshot_id"] = apply_reconciliation(sp, entry, ledger)
+            elif entry["tracks"]:
+                entry["snapshot_id"] = add_tracks_to_playlist(sp, entry["playlist_id"], entry["tracks"], ledger)
+        if entry["tracks"]:
+            logger.info(f"Added {len(entry['tracks'])} tracks to {entry['season']} {entry['year']} playlist")
+    
+    # The ledger remembers what earlier (possibly interrupted) runs already added
+    own_ledger = ledger is None
+    if own_ledger:
+        ledger = AddLedger()
+    try:
+        if len(entries) == 1 or workers <= 1:
+            for entry in entries:
+                apply_entry(entry)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Re-raise the first error any worker hit
+                list(executor.map(apply_entry, entries))
+    finally:
+        if own_ledger:
+            ledger.close()
+
+def plan_seasonal_update(sp, full_sync=False, job=None, mirror=None):
+    """
+    Plan adding the main playlist's new tracks to the current seasonal playlist.
+    
+    Only the job's first period scheme is planned, so pass one job from
+    job_schemes at a time. Nothing is written. The main playlist is read
+    through its PlaylistMirror, so an unchanged main playlist costs a single
+    metadata request and a changed one only has its newly appended tracks
+    fetched. The first time, the main playlist is read from its end back to
+    the start of the current season. The seasonal playlist's snapshot_id and
+    track IDs are remembered between runs in the sync state.
+    
+    A job with several sources has them merged (see merge_tracks), and
+    their mirrors are read in full the first time, so that a track which
+    was in another source before this season isn't added again.
+    
+    Args:
+        sp: Spotify client
+        full_sync: Ignore the saved sync state and mirror and re-read both playlists in full
+        job: Source playlist and seasonal playlist settings (defaults to default_job())
+        mirror: PlaylistMirror of the source playlist (defaults to opening MIRROR_PATH)
+    
+    Returns:
+        (plan, state changes, seasonal playlist state) where the state
+        changes are the sync state entries to save once the plan is applied,
+        and the seasonal playlist state is None if the playlist doesn't exist
+        yet. All three are None if the main playlist is unchanged.
+    """
+    job = job_schemes(job or default_job())[0]
+    sources = source_keys(job)
+    
+    # Find the current season's period; the next boundary is its end
+    season_calendar = get_period_calendar(job)
+    current_period = season_calendar.period_at(time.time())
+    if current_period is None:
+        logger.info(f"No {job['scheme']['name']} period is under way, nothing to do")
+        return None, None, None
+    current_boundary = season_calendar.boundaries[current_period]
+    current_season = current_boundary['name']
+    current_season_year = current_boundary['year']
+    
+    logger.info(f"Current season: {current_season} {current_season_year}")
+    
+    main_key = job_state_key(job)
+    
+    state = {} if full_sync else load_sync_state()
+    main_state = state.get(main_key)
+    
+    season_start = current_boundary['date']
+    season_end = season_calendar.boundaries[current_period + 1]['date']
+    
+    # Only tracks added since the last run (or since the season started) are new
+    since = season_calendar.period_start(current_period)
+    if main_state:
+        since = max(since, parse_timestamp(main_state["added_at"]))
+    
+    # Bring the local copy of the main playlist up to date; a matching
+    # snapshot means nothing was added since the last run
+    own_mirror = mirror is None
+    if own_mirror:
+        mirror = PlaylistMirror()
+    try:
+        with METRICS.phase("main fetch"):
+            main_snapshot = sync_sources(sp, mirror, sources, since if len(sources) == 1 else None, full=full_sync)
+        if main_state and main_state["snapshot_id"] == main_snapshot:
+            logger.info("Main playlist unchanged since last sync, nothing to do")
+            return None, None, None
+        
+        logger.info(f"Season date range: {season_start} to {season_end}")
+        
+        # Filter tracks to only include those added during the current season,
+        # merging the sources newest first
+        with METRICS.phase("diff"):
+            season_end_timestamp = season_calendar.period_end(current_period)
+            windows = [mirror.tracks(source, since, season_end_timestamp, newest_first=True) for source in sources]
+            if len(sources) > 1:
+                owners = source_owners(mirror, sources)
+                windows = [
+                    [track for track in window if owners.get(track.id) == source]
+                    for source, window in zip(sources, windows)
+                ]
+            current_season_tracks = list(merge_tracks(windows, newest_first=True))
+            print_recent_tracks(list(merge_tracks(
+                [mirror.tracks(source, newest_first=True, limit=5) for source in sources], newest_first=True
+            ))[:5])
+            newest = list(merge_tracks(
+                [mirror.tracks(source, since, newest_first=True, limit=1) for source in sources], newest_first=True
+            ))[:1]
+    finally:
+        if own_mirror:
+            mirror.close()
+    
+    # Remember the newest added_at we've seen as the starting point for the next run
+    new_main_state = {
+        "snapshot_id": main_snapshot,
+        "added_at": format_timestamp(newest[0].added_at if newest else since)
+    }
+    
+    logger.info(f"Found {len(current_season_tracks)} tracks for current season")
+    
+    plan = new_plan(job)
+    state_changes = {main_key: new_main_state}
+    if not current_season_tracks:
+        logger.info("No new tracks to add")
+        return plan, state_changes, None
+    
+    with METRICS.phase("seasonal fetch"):
+        # Find the seasonal playlist; if it doesn't exist yet, applying the plan creates it
+        seasonal_playlist_id = find_seasonal_playlist(sp, current_season, current_season_year, job)
+        
+        # Get tracks already in the seasonal playlist, reusing the saved IDs if it hasn't changed
+        if seasonal_playlist_id is None:
+            existing_track_ids = []
+            seasonal_state = None
+        else:
+            seasonal_state = state.get(seasonal_playlist_id)
+            seasonal_snapshot, _ = get_playlist_snapshot(sp, seasonal_playlist_id)
+            if seasonal_state and seasonal_state["snapshot_id"] == seasonal_snapshot:
+                existing_track_ids = seasonal_state["track_ids"]
+                logger.debug("Seasonal playlist unchanged since last sync, using saved track IDs")
+            else:
+                existing_track_ids = get_playlist_track_ids(sp, seasonal_playlist_id)
+                seasonal_state = {"snapshot_id": seasonal_snapshot, "track_ids": existing_track_ids}
+    
+    logger.info(f"Found {len(existing_track_ids)} existing tracks in the seasonal playlist")
+    
+    # Debug: Print all existing track IDs
+    logger.debug("First few existing track IDs in seasonal playlist:")
+    for i, track_id in enumerate(existing_track_ids[:5]):
+        logger.debug(f"  {i+1}. {track_id}")
+    
+    # Filter out tracks that are already in the seasonal playlist
+    with METRICS.phase("diff"):
+        existing_track_id_set = set(existing_track_ids)
+        new_track_ids = plan_additions(
+            plan, current_season, current_season_year, seasonal_playlist_id, existing_track_id_set,
+            current_season_tracks
+        )
+    
+    if new_track_ids:
+        logger.info(f"New tracks to add: {len(new_track_ids)}")
+        for track in current_season_tracks:
+            if track.id not in existing_track_id_set:
+                logger.debug(f"  - {track.name} (added {format_timestamp(track.added_at)})")
+    else:
+        logger.info("No new tracks to add")
+        
+        # Debug: Print the first few tracks from the main playlist that fall within the season
+        logger.debug("Tracks from main playlist that fall within the current season:")
+        for i, track in enumerate(current_season_tracks[:5]):
+            logger.debug(f"  {i+1}. {track.name} (added {format_timestamp(track.added_at)})")
+            logger.debug(f"     Track ID: {track.id}")
+    
+    return plan, state_changes, seasonal_state
+
+def update_seasonal_playlist(sp, full_sync=False, job=None, ledger=None, mirror=None):
+    """
+    Update the current seasonal playlist with new tracks from the main playlist.
+    
+    Plans the update of each of the job's period schemes with
+    plan_seasonal_update, applies it and then saves the sync state. The main
+    playlist's mirror is only read from Spotify for the first scheme; the
+    others just check that its snapshot hasn't changed since.
+    
+    Args:
+        sp: Spotify client
+        full_sync: Ignore the saved sync state and re-read both playlists in full
+        job: Source playlist and seasonal playlist settings (defaults to default_job())
+        ledger: AddLedger to record writes in (defaults to opening LEDGER_PATH)
+        mirror: PlaylistMirror of the source playlist (defaults to opening MIRROR_PATH)
+    
+    Returns:
+        True if the main playlist changed since the last sync, False otherwise
+    """
+    changed = False
+    for scheme_job in job_schemes(job or default_job()):
+        changed |= update_scheme_playlist(sp, full_sync, scheme_job, ledger, mirror)
+    return changed
+
+def update_scheme_playlist(sp, full_sync, job, ledger=None, mirror=None):
+    """Update the current playlist of one of a job's period schemes, see update_seasonal_playlist."""
+    plan, state_changes, seasonal_state = plan_seasonal_update(sp, full_sync, job, mirror)
+    if plan is None:
+        return False
+    
+    # Add new tracks to the seasonal playlist, recording them in the ledger
+    # so retroactive runs know about them
+    apply_plan(sp, plan, ledger)
+    
+    for entry in plan["playlists"].values():
+        if entry["tracks"]:
+            previous_track_ids = seasonal_state["track_ids"] if seasonal_state else []
+            seasonal_state = {
+                "snapshot_id": entry["snapshot_id"],
+                "track_ids": previous_track_ids + entry["tracks"]
+            }
+        if seasonal_state:
+            state_changes[entry["playlist_id"]] = seasonal_state
+    
+    # Only record the sync once the writes have gone through
+    update_sync_state(state_changes)
+    return True
+
+def check_for_season_change(sp, boundary=None, job=None):
+    """
+    Check if it's time to create the next season's playlist.
+    
+    Args:
+        sp: Spotify client
+        boundary: The calendar entry of the season that just began, in the
+            job's first period scheme. If given, that season's playlist is
+            created directly instead of checking whether we're within a day
+            of the next season change of each scheme.
+        job: Seasonal playlist settings (defaults to default_job())
+    """
+    job = job or default_job()
+    if boundary is not None:
+        find_or_create_seasonal_playlist(sp, boundary['name'], boundary['year'], job_schemes(job)[0])
+        logger.info(f"Created playlist for new season: {boundary['name']} {boundary['year']}")
+        return
+    
+    now = time.time()
+    for scheme_job in job_schemes(job):
+        next_boundary = get_period_calendar(scheme_job).next_boundary(now)
+        
+        # If we're within 1 day of the season change, create the next season's playlist
+        if next_boundary and next_boundary['timestamp'] - now <= 86400:
+            find_or_create_seasonal_playlist(sp, next_boundary['name'], next_boundary['year'], scheme_job)
+            logger.info(f"Created playlist for upcoming season: {next_boundary['name']} {next_boundary['year']}")
+
+def next_period_start(job, timestamp):
+    """
+    Find the first period of any of a job's schemes to start after timestamp.
+    
+    Returns (job from job_schemes, calendar entry), or (None, None) if no
+    scheme has another period.
+    """
+    upcoming = []
+    for scheme_job in job_schemes(job):
+        boundary = get_period_calendar(scheme_job).next_boundary(timestamp)
+        if boundary:
+            upcoming.append((boundary['timestamp'], scheme_job, boundary))
+    if not upcoming:
+        return None, None
+    _, scheme_job, boundary = min(upcoming, key=lambda entry: entry[0])
+    return scheme_job, boundary
+
+def read_season_playlist(sp, ledger, season, year, job=None):
+    """
+    Find one season's playlist and the track IDs it already has.
+    
+    Returns (playlist ID, set of track IDs), with (None, empty set) if the
+    playlist doesn't exist yet.
+    """
+    with METRICS.phase("seasonal fetch"):
+        playlist_id = find_seasonal_playlist(sp, season, year, job)
+        if playlist_id is None:
+            return None, set()
+        
+        # Read the playlist from Spotify only the first time we see it
+        if not ledger.is_seeded(playlist_id):
+            ledger.seed(playlist_id, get_playlist_track_ids(sp, playlist_id))
+        return playlist_id, ledger.track_ids(playlist_id)
+
+def read_season_playlist_positions(sp, ledger, season, year, job=None):
+    """
+    Find one season's playlist and read the track ID at each of its positions.
+    
+    Returns (playlist ID, snapshot_id, track IDs by position), with
+    (None, None, []) if the playlist doesn't exist yet. The ledger is
+    brought in line with what was read, including tracks removed by hand.
+    """
+    with METRICS.phase("seasonal fetch"):
+        playlist_id = find_seasonal_playlist(sp, season, year, job)
+        if playlist_id is None:
+            return None, None, []
+        
+        snapshot_id, track_ids = get_playlist_positions(sp, playlist_id)
+        present = {track_id for track_id in track_ids if track_id}
+        ledger.discard(playlist_id, ledger.track_ids(playlist_id) - present)
+        ledger.seed(playlist_id, present)
+        return playlist_id, snapshot_id, track_ids
+
+def plan_retroactive(sp, start_year=None, workers=None, job=None, ledger=None, mirror=None, reconcile=False,
+                     full_sync=False):
+    """
+    Plan seasonal playlists for past seasons based on when songs were added to the main playlist.
+    
+    Nothing is written to Spotify; see create_retroactive_seasonal_playlists.
+    Like plan_seasonal_update, this only plans one period scheme. The main
+    playlist is read through its PlaylistMirror, so once it has been
+    mirrored in full, planning any range of years is a local query. With
+    reconcile, every existing seasonal playlist is also read in full and
+    planned to match its season of the main playlist exactly, see
+    plan_reconciliation.
+    
+    Args:
+        sp: Spotify client
+        start_year: The year to start creating playlists from (defaults to current year - 1)
+        workers: Number of seasonal playlists read concurrently (defaults to SEASON_WORKERS)
+        job: Source playlist and seasonal playlist settings (defaults to default_job())
+        ledger: AddLedger caching what the seasonal playlists contain (defaults to opening LEDGER_PATH)
+        mirror: PlaylistMirror of the source playlist (defaults to opening MIRROR_PATH)
+        reconcile: Also plan removing tracks no longer in the main playlist and
+            reordering the seasonal playlists to match it. Pass full_sync
+            too, unless the mirror was just read in full, since it may not
+            have noticed tracks moved within the main playlist.
+        full_sync: Discard the mirrored copies of the sources and read them again
+        
+    Returns:
+        The plan
+    """
+    job = job_schemes(job or default_job())[0]
+    plan = new_plan(job)
+    
+    now = time.time()
+    current_year = datetime.now().year
+    if start_year is None:
+        start_year = current_year - 1
+    
+    own_mirror = mirror is None
+    if own_mirror:
+        mirror = PlaylistMirror()
+    try:
+        # Bring the local copy of every source up to date
+        sources = source_keys(job)
+        with METRICS.phase("main fetch"):
+            sync_sources(sp, mirror, sources, full=full_sync)
+        
+        first_added = [mirror.first_added_at(source) for source in sources]
+        earliest_added_at = min((added_at for added_at in first_added if added_at is not None), default=None)
+        if earliest_added_at is None:
+            logger.info("No tracks found in the main playlist")
+            return plan
+        
+        # Get the earliest date
+        earliest_date = from_timestamp(earliest_added_at)
+        logger.debug(f"Earliest track date: {earliest_date}")
+        
+        # Ensure we don't go earlier than the start_year
+        earliest_year = max(earliest_date.year, start_year)
+        
+        # Season calendar from earliest year to current year (with buffer years)
+        season_calendar = get_period_calendar(job, earliest_year - 1, current_year + 1)
+        
+        # Only the tracks the calendar covers are read from the mirror, oldest first
+        with METRICS.phase("diff"):
+            all_tracks = list(merge_tracks(
+                [mirror.tracks(source, season_calendar.period_start(0)) for source in sources]
+            ))
+            # Reconciled playlists follow the main playlist's order rather than when tracks
+            # were added. A track can be in the main playlist more than once, so each
+            # season goes by where the track is within its own slice. With several
+            # sources, the order they were merged in is used as it is.
+            main_positions = {}
+            if reconcile and len(sources) == 1:
+                for i, boundary in enumerate(season_calendar.boundaries[:-1]):
+                    if boundary['name'] is not None and season_calendar.period_start(i) <= now:
+                        main_positions[boundary['name'], boundary['year']] = mirror.first_positions(
+                            sources[0], season_calendar.period_start(i), season_calendar.period_end(i)
+                        )
+    finally:
+        if own_mirror:
+            mirror.close()
+    
+    logger.info(f"Read {len(all_tracks)} tracks from the main playlist mirror")
+    
+    # Assign every track to its season period in one pass over the sorted tracks
+    with METRICS.phase("diff"):
+        period_tracks = season_calendar.bucket(all_tracks)
+    
+    # Create a dictionary to hold tracks for each season period
+    seasonal_tracks = {}
+    
+    # Process each season period
+    for i in range(len(season_calendar.boundaries) - 1):
+        current_boundary = season_calendar.boundaries[i]
+        next_boundary = season_calendar.boundaries[i + 1]
+        
+        season = current_boundary['name']
+        year = current_boundary['year']
+        
+        # Skip gaps between the periods of a custom scheme
+        if season is None:
+            continue
         
         # Skip if this period is entirely in the future
-        if season_start > datetime.now():
+        if season_calendar.period_start(i) > now:
             continue
         
         # Skip if this period is entirely before our earliest track
-        if season_end < earliest_date:
+        if season_calendar.period_end(i) < earliest_added_at:
             continue
         
         # Create a key for this season period
-        season_key = f"{season}_{year}"
-        
-        print(f"Processing {season_key}: {season_start} to {season_end}")
+        season_key = (season, year)
         
-        # Find tracks added during this season
-        seasonal_tracks[season_key] = []
+        logger.debug(f"Processing {season} {year}: {current_boundary['date']} to {next_boundary['date']}")
         
-        for track in all_tracks:
-            added_at = track["added_at"]
-            # Include tracks added during this season period
-            # Note: We use >= for start and < for end to avoid double-counting
-            if season_start <= added_at < season_end:
-                seasonal_tracks[season_key].append(track)
+        # Tracks added during this season period
+        seasonal_tracks[season_key] = period_tracks[i]
         
-        print(f"Found {len(seasonal_tracks[season_key])} tracks for {season} {year}")
+        logger.info(f"Found {len(seasonal_tracks[season_key])} tracks for {season} {year}")
     
-    # Create playlists for each season that has tracks
-    for season_key, tracks in seasonal_tracks.items():
-        if not tracks:
-            continue
+    from concurrent.futures import ThreadPoolExecutor
+    
+    if workers is None:
+        workers = SEASON_WORKERS
+    
+    # Seasonal playlists are independent, so several are read at once, all
+    # sharing the client's rate limit
+    get_playlist_index(sp, job["user_id"])
+    
+    # The ledger remembers what earlier (possibly interrupted) runs already added
+    own_ledger = ledger is None
+    if own_ledger:
+        ledger = AddLedger()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            reads = []
+            for (season, year), tracks in seasonal_tracks.items():
+                # A season with no tracks left may still have a playlist to empty
+                if not tracks and not reconcile:
+                    continue
+                
+                read = read_season_playlist_positions if reconcile else read_season_playlist
+                future = executor.submit(read, sp, ledger, season, year, job)
+                reads.append((season, year, tracks, future))
+            
+            # Plan in season order, re-raising the first error any worker hit
+            for season, year, tracks, future in reads:
+                if reconcile:
+                    playlist_id, snapshot_id, playlist_track_ids = future.result()
+                    if (season, year) in main_positions:
+                        positions = main_positions[season, year]
+                        tracks = sorted(tracks, key=lambda track: positions[track.id])
+                    if playlist_id is None:
+                        if tracks:
+                            plan_additions(plan, season, year, None, set(), tracks)
+                        continue
+                    with METRICS.phase("diff"):
+                        entry = plan_reconciliation(
+                            plan, season, year, playlist_id, snapshot_id, playlist_track_ids, tracks
+                        )
+                    if not has_changes(entry):
+                        logger.info(f"{season} {year} playlist already matches the main playlist")
+                    continue
+                
+                playlist_id, existing_track_ids = future.result()
+                with METRICS.phase("diff"):
+                    new_track_ids = plan_additions(plan, season, year, playlist_id, existing_track_ids, tracks)
+                if not new_track_ids:
+                    logger.info(f"No new tracks to add to {season} {year} playlist")
+    finally:
+        if own_ledger:
+            ledger.close()
+    
+    return plan
+
+def stream_retroactive_backfill(sp, start_year=None, workers=None, job=None, ledger=None, mirror=None, full_sync=False):
+    """
+    Fill past seasons' playlists while the main playlist is still being read.
+    
+    The main playlist is streamed from its PlaylistMirror in playlist order,
+    merged with the job's other sources by added_at (see merge_tracks) if it
+    has any. Each track is routed to its period in every one of the job's period
+    schemes as it arrives, so any number of schemes share a single pass. As
+    soon as a season has 100 tracks its playlist is missing, they are queued
+    for that season's writer while reading carries on. Each season has at
+    most one writer, so its batches go out in order. Writers have their own
+    pool, so they don't queue behind the seasonal playlist reads started up
+    front. Reading pauses while BACKFILL_BUFFER tracks are queued.
+    
+    The seasonal playlists' contents stay in the ledger's file until a
+    season is routed to, and a season is closed (flushed, and its sets of
+    routed and existing tracks dropped) once the stream reaches a track
+    added after the season's end. A track that turns up after its season
+    closed, e.g. in a reordered main playlist, reopens it from the ledger.
+    So per-season state only grows with the seasons still open, not with
+    the playlist.
+    
+    Args:
+        sp: Spotify client
+        start_year: The year to start creating playlists from (defaults to current year - 1)
+        workers: Number of seasonal playlists read, and as many written, concurrently (defaults to SEASON_WORKERS)
+        job: Source playlist and seasonal playlist settings (defaults to default_job())
+        ledger: AddLedger caching what the seasonal playlists contain (defaults to opening LEDGER_PATH)
+        mirror: PlaylistMirror of the source playlist (defaults to opening MIRROR_PATH)
+        full_sync: Discard the mirrored copies of the sources and read them again
+    """
+    import heapq
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    
+    job = job or default_job()
+    current_year = datetime.now().year
+    if start_year is None:
+        start_year = current_year - 1
+    if workers is None:
+        workers = SEASON_WORKERS
+    
+    # Calendars from the year before start_year to next year, like plan_retroactive
+    scheme_jobs = job_schemes(job)
+    calendars = [get_period_calendar(scheme_job, start_year - 1, current_year + 1) for scheme_job in scheme_jobs]
+    get_playlist_index(sp, job["user_id"])
+    
+    own_mirror = mirror is None
+    if own_mirror:
+        mirror = PlaylistMirror()
+    own_ledger = ledger is None
+    if own_ledger:
+        ledger = AddLedger()
+    
+    # Per (scheme, period index): the period's name, the read of its playlist,
+    # the tracks routed to it and not yet queued, and the batches queued for
+    # its writer. "routed" is None while the season is closed.
+    seasons = {}
+    # (end, scheme, period index) of every open season
+    open_seasons = []
+    queue_lock = threading.Lock()
+    queued = threading.BoundedSemaphore(max(1, BACKFILL_BUFFER // 100))
+    errors = []
+    
+    def write_batch(season, track_ids):
+        with METRICS.phase("writes"):
+            if season["playlist_id"] is None:
+                season["playlist_id"] = create_seasonal_playlist(
+                    sp, season["season"], season["year"], season["job"], ledger
+                )
+            add_tracks_to_playlist(sp, season["playlist_id"], track_ids, ledger)
+    
+    def drain(season):
+        # Write a season's queued batches in order until its queue is empty
+        while True:
+            with queue_lock:
+                if not season["queue"]:
+                    season["writing"] = False
+                    return
+                batch = season["queue"][0]
+            try:
+                write_batch(season, batch)
+            except Exception as e:
+                # Later batches would land out of order, so drop them and stop the backfill
+                with queue_lock:
+                    errors.append(e)
+                    for _ in season["queue"]:
+                        queued.release()
+                    season["queue"].clear()
+                raise
+            with queue_lock:
+                season["queue"].popleft()
+                season["added"] += len(batch)
+            queued.release()
+    
+    def prefetch(name, year, scheme_job):
+        # Seed the ledger now, but leave the contents in its file until the season is routed to
+        playlist_id, _ = read_season_playlist(sp, ledger, name, year, scheme_job)
+        if playlist_id is not None:
+            ledger.release(playlist_id)
+        return playlist_id
+    
+    def flush(season, everything=False):
+        # Only the first flush can find playlist_id unset, before any writer could create the playlist
+        if season["read"] is not None:
+            season["playlist_id"] = season["read"].result()
+            season["read"] = None
+        # The playlist's contents are only needed once there is something to write
+        if season["existing"] is None:
+            playlist_id = season["playlist_id"]
+            season["existing"] = ledger.track_ids(playlist_id) if playlist_id else set()
+        season["buffer"] = [track_id for track_id in season["buffer"] if track_id not in season["existing"]]
+        while len(season["buffer"]) >= 100 or (everything and season["buffer"]):
+            batch, season["buffer"] = season["buffer"][:100], season["buffer"][100:]
+            queued.acquire()
+            with queue_lock:
+                if errors:
+                    queued.release()
+                    raise errors[0]
+                season["queue"].append(batch)
+                start_writer = not season["writing"]
+                season["writing"] = True
+            if start_writer:
+                writers.submit(drain, season)
+    
+    def close(key):
+        season = seasons[key]
+        flush(season, everything=True)
+        season["routed"] = season["existing"] = None
+        if season["playlist_id"]:
+            ledger.release(season["playlist_id"])
+    
+    def reopen(key):
+        # Tracks still queued aren't in the ledger yet, so they count as routed.
+        # The queue is read before the playlist ID, which a writer may be setting.
+        season = seasons[key]
+        with queue_lock:
+            season["routed"] = {track_id for batch in season["queue"] for track_id in batch}
+        heapq.heappush(open_seasons, (calendars[key[0]].starts[key[1] + 1], *key))
+    
+    try:
+        # Writers get a pool of their own, so queued batches never wait behind reads
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as readers, \
+                ThreadPoolExecutor(max_workers=max(1, workers)) as writers:
+            # Start reading every past season's playlist now, so the reads
+            # overlap with the main playlist's instead of waiting for it
+            now = time.time()
+            reads = {}
+            for k, season_calendar in enumerate(calendars):
+                for i, boundary in enumerate(season_calendar.boundaries[:-1]):
+                    if boundary["name"] is not None and season_calendar.period_start(i) <= now:
+                        reads[k, i] = readers.submit(
+                            prefetch, boundary["name"], boundary["year"], scheme_jobs[k]
+                        )
             
-        season, year = season_key.split("_")
-        year = int(year)
+            # Streams take their source's sync lock until they finish, so they
+            # are opened in a fixed order to keep jobs sharing sources apart
+            streams = [
+                (track for chunk in mirror.stream(sp, source, full=full_sync) for track in chunk)
+                for source in sorted(source_keys(job))
+            ]
+            newest = -math.inf
+            with METRICS.phase("main fetch"):
+                for track in merge_tracks(streams):
+                    if track.added_at > newest:
+                        newest = track.added_at
+                        while open_seasons and open_seasons[0][0] <= newest:
+                            _, k, i = heapq.heappop(open_seasons)
+                            close((k, i))
+                    
+                    for k, season_calendar in enumerate(calendars):
+                        i = season_calendar.period_at(track.added_at)
+                        if i is None:
+                            continue
+                        
+                        season = seasons.get((k, i))
+                        if season is None:
+                            name = season_calendar.boundaries[i]["name"]
+                            year = season_calendar.boundaries[i]["year"]
+                            if (k, i) not in reads:
+                                reads[k, i] = readers.submit(prefetch, name, year, scheme_jobs[k])
+                            season = seasons[k, i] = {
+                                "job": scheme_jobs[k], "season": name, "year": year, "playlist_id": None,
+                                "existing": None, "read": reads.pop((k, i)), "routed": set(), "buffer": [],
+                                "queue": deque(), "writing": False, "added": 0
+                            }
+                            heapq.heappush(open_seasons, (season_calendar.starts[i + 1], k, i))
+                        elif season["routed"] is None:
+                            reopen((k, i))
+                        
+                        # Each track goes to a season once, however often it is in the main playlist
+                        if track.id in season["routed"]:
+                            continue
+                        season["routed"].add(track.id)
+                        season["buffer"].append(track.id)
+                        if len(season["buffer"]) >= 100:
+                            flush(season)
+            
+            for key in sorted(seasons):
+                if seasons[key]["routed"] is not None:
+                    flush(seasons[key], everything=True)
+        
+        # Re-raise the first error any worker hit, once the others have finished
+        if errors:
+            raise errors[0]
+    finally:
+        if own_ledger:
+            ledger.close()
+        if own_mirror:
+            mirror.close()
+    
+    if not seasons:
+        logger.info("No tracks found in the main playlist")
+    for key in sorted(seasons):
+        season = seasons[key]
+        if season["added"]:
+            logger.info(f"Added {season['added']} tracks to {season['season']} {season['year']} playlist")
+        else:
+            logger.info(f"No new tracks to add to {season['season']} {season['year']} playlist")
+
+def create_retroactive_seasonal_playlists(sp, start_year=None, workers=None, job=None, ledger=None, mirror=None,
+                                          reconcile=False, full_sync=False):
+    """
+    Create seasonal playlists retroactively based on when songs were added to the main playlist.
+    
+    A plain backfill is streamed with stream_retroactive_backfill, writing
+    each season's tracks while the main playlist is still being read. With
+    reconcile the whole backfill of each period scheme is planned first with
+    plan_retroactive, then applied, since removals and moves need every
+    track of a season.
+    
+    Args:
+        sp: Spotify client
+        start_year: The year to start creating playlists from (defaults to current year - 1)
+        workers: Number of seasonal playlists read and written concurrently (defaults to SEASON_WORKERS)
+        job: Source playlist and seasonal playlist settings (defaults to default_job())
+        ledger: AddLedger to record adds in (defaults to opening LEDGER_PATH)
+        mirror: PlaylistMirror of the source playlist (defaults to opening MIRROR_PATH)
+        reconcile: Also remove tracks no longer in the main playlist and
+            reorder the seasonal playlists to match it
+        full_sync: Discard the mirrored copy of the main playlist and read it again
+    """
+    own_ledger = ledger is None
+    if own_ledger:
+        ledger = AddLedger()
+    try:
+        if not reconcile:
+            stream_retroactive_backfill(sp, start_year, workers, job, ledger, mirror, full_sync)
+            return
+        for i, scheme_job in enumerate(job_schemes(job or default_job())):
+            # The mirror doesn't notice tracks moved within the main playlist, so
+            # reconciling reads it again; that leaves it up to date for the other schemes
+            plan = plan_retroactive(sp, start_year, workers, scheme_job, ledger, mirror, reconcile, i == 0)
+            apply_plan(sp, plan, ledger, workers)
+    finally:
+        if own_ledger:
+            ledger.close()
+
+def make_plans(sp, retroactive=False, start_year=None, full_sync=False, job=None, ledger=None, mirror=None,
+               reconcile=False):
+    """
+    Plan a regular or retroactive run for a --dry-run.
+    
+    Returns one plan per period scheme of the job, empty if there is nothing to do.
+    """
+    plans = []
+    for i, scheme_job in enumerate(job_schemes(job or default_job())):
+        if retroactive:
+            plan = plan_retroactive(
+                sp, start_year, job=scheme_job, ledger=ledger, mirror=mirror, reconcile=reconcile,
+                full_sync=(full_sync or reconcile) and i == 0
+            )
+        else:
+            plan, _, _ = plan_seasonal_update(sp, full_sync, scheme_job, mirror)
+        plans.append(plan or new_plan(scheme_job))
+    return plans
+
+def build_season_report(sp, start_year=None, job=None, mirror=None, metadata=None, top=5):
+    """
+    Summarize every season of the main playlist: track count, total duration,
+    top artists and genres and who added the most tracks.
+    
+    Tracks come from the PlaylistMirror, and the durations and artists kept
+    with them. Artist names and genres, and the details of tracks mirrored
+    before those were kept, come from the MetadataCache, so once it's warm a
+    report only costs the mirror's sync.
+    
+    Args:
+        sp: Spotify client
+        start_year: The first year to report on (defaults to the whole history)
+        job: Source playlist settings (defaults to default_job()); all of its sources are reported on together
+        mirror: PlaylistMirror of the source playlist (defaults to opening MIRROR_PATH)
+        metadata: MetadataCache to use (defaults to opening METADATA_CACHE_PATH)
+        top: How many artists and genres to list per season
+    
+    Returns:
+        The report as a JSON-serializable dict
+    """
+    job = job or default_job()
+    now = time.time()
+    report = {"playlist": job["source"], "generated_at": format_timestamp(now), "seasons": []}
+    
+    own_mirror = mirror is None
+    if own_mirror:
+        mirror = PlaylistMirror()
+    try:
+        sources = source_keys(job)
+        with METRICS.phase("main fetch"):
+            sync_sources(sp, mirror, sources)
+        first_added = [mirror.first_added_at(source) for source in sources]
+        earliest_added_at = min((added_at for added_at in first_added if added_at is not None), default=None)
+        if earliest_added_at is None:
+            return report
+        owners = source_owners(mirror, sources) if len(sources) > 1 else None
         
-        # Create the seasonal playlist
-        playlist_id = find_or_create_seasonal_playlist(sp, season, year)
+        first_year = max(from_timestamp(earliest_added_at).year, start_year or 0)
+        season_calendar = get_season_calendar(first_year - 1, datetime.now().year + 1)
+        periods = []
+        for i in range(len(season_calendar.boundaries) - 1):
+            if season_calendar.period_start(i) > now or season_calendar.period_end(i) < earliest_added_at:
+                continue
+            start, end = season_calendar.period_start(i), season_calendar.period_end(i)
+            tracks = list(merge_tracks(
+                [
+                    [track for track in mirror.track_details(source, start, end)
+                     if owners is None or owners.get(track["track_id"]) == source]
+                    for source in sources
+                ],
+                added_at=itemgetter("added_at"), track_id=itemgetter("track_id")
+            ))
+            if tracks:
+                periods.append((season_calendar.boundaries[i], tracks))
+    finally:
+        if own_mirror:
+            mirror.close()
+    
+    own_metadata = metadata is None
+    if own_metadata:
+        metadata = MetadataCache()
+    try:
+        with METRICS.phase("enrichment"):
+            # Fill in tracks mirrored before durations and artists were kept
+            all_tracks = [track for _, tracks in periods for track in tracks]
+            missing = [track["track_id"] for track in all_tracks if track["artist_ids"] is None]
+            if missing:
+                looked_up = metadata.tracks(sp, missing)
+                for track in all_tracks:
+                    if track["artist_ids"] is None and track["track_id"] in looked_up:
+                        track.update(looked_up[track["track_id"]])
+            
+            artists = metadata.artists(sp, [
+                artist_id for track in all_tracks for artist_id in track["artist_ids"] or []
+            ])
+    finally:
+        if own_metadata:
+            metadata.close()
+    
+    for boundary, tracks in periods:
+        artist_counts = {}
+        genre_counts = {}
+        adder_counts = {}
+        for track in tracks:
+            genres = set()
+            for artist_id in track["artist_ids"] or []:
+                artist_counts[artist_id] = artist_counts.get(artist_id, 0) + 1
+                genres.update(artists.get(artist_id, {}).get("genres", []))
+            for genre in genres:
+                genre_counts[genre] = genre_counts.get(genre, 0) + 1
+            if track["added_by"]:
+                adder_counts[track["added_by"]] = adder_counts.get(track["added_by"], 0) + 1
         
-        # Get existing tracks in the playlist
-        existing_tracks = sp.playlist_items(
-            playlist_id, 
-            fields="items(track(id))"
+        top_artists = sorted(artist_counts.items(), key=lambda item: (-item[1], item[0]))[:top]
+        top_genres = sorted(genre_counts.items(), key=lambda item: (-item[1], item[0]))[:top]
+        top_adder = min(adder_counts.items(), key=lambda item: (-item[1], item[0]), default=None)
+        report["seasons"].append({
+            "season": boundary["name"],
+            "year": boundary["year"],
+            "tracks": len(tracks),
+            "duration_ms": sum(track["duration_ms"] or 0 for track in tracks),
+            "top_artists": [
+                {"id": artist_id, "name": artists.get(artist_id, {}).get("name"), "tracks": count}
+                for artist_id, count in top_artists
+            ],
+            "top_genres": [{"genre": genre, "tracks": count} for genre, count in top_genres],
+            "top_adder": {"id": top_adder[0], "tracks": top_adder[1]} if top_adder else None
+        })
+    return report
+
+def format_season_report(report):
+    """Render a report from build_season_report as plain text."""
+    lines = [f"Season report for playlist {report['playlist']} ({report['generated_at']})"]
+    for season in report["seasons"]:
+        minutes = season["duration_ms"] // 60000
+        lines.append(
+            f"{season['season']} {season['year']}: {season['tracks']} tracks, {minutes // 60}h {minutes % 60}m"
         )
-        existing_track_ids = [item["track"]["id"] for item in existing_tracks["items"] if item["track"]]
+        if season["top_artists"]:
+            artists = ", ".join(
+                f"{artist['name'] or artist['id']} ({artist['tracks']})" for artist in season["top_artists"]
+            )
+            lines.append(f"  Top artists: {artists}")
+        if season["top_genres"]:
+            genres = ", ".join(f"{genre['genre']} ({genre['tracks']})" for genre in season["top_genres"])
+            lines.append(f"  Top genres: {genres}")
+        if season["top_adder"]:
+            lines.append(f"  Most tracks added by: {season['top_adder']['id']} ({season['top_adder']['tracks']})")
+    return "\n".join(lines)
+
+def load_run_config(path):
+    """
+    Load a config file describing several jobs to run in one process.
+    
+    The file is JSON, for example:
+    
+        {
+            "workers": 4,
+            "rate_limit": 10,
+            "accounts": {
+                "archie": {"user_id": "archie_id", "token_cache": ".cache-archie"}
+            },
+            "jobs": [
+                {"name": "us", "account": "archie", "sources": ["playlist_id", "liked"],
+                 "name_template": "archie + kotoha {season} {year}",
+                 "description_template": "songs from our playlist during {season} {year}",
+                 "share_with": "kotoha_id",
+                 "schemes": ["season", {"scheme": "month", "name_template": "archie + kotoha {period} {year}"}]}
+            ]
+        }
+    
+    A job with a single source playlist can give it as "source" instead, and
+    "liked" stands for the account's Liked Songs. Jobs without an account run
+    as SPOTIPY_USER_ID with the default token cache, and missing templates
+    and schemes fall back to the SPOTIPY_* settings. See parse_scheme for the
+    period schemes a job can have.
+    
+    Returns:
+        Dict with "workers", "rate_limit", "accounts" (name -> user_id and
+        token_cache, with None for the default account) and "jobs"
+        
+    Raises:
+        ValueError: If the file can't be read or describes invalid jobs
+    """
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Can't read config file {path}: {e}")
+    
+    accounts = {None: {"user_id": USER_ID, "token_cache": TOKEN_CACHE_PATH}}
+    for name, account in raw.get("accounts", {}).items():
+        if not account.get("user_id"):
+            raise ValueError(f"Account {name} has no user_id")
+        accounts[name] = {"user_id": account["user_id"], "token_cache": account.get("token_cache", f".cache-{name}")}
+    
+    jobs = []
+    for i, entry in enumerate(raw.get("jobs", [])):
+        sources = entry.get("sources") or ([entry["source"]] if entry.get("source") else [])
+        if not isinstance(sources, list) or not all(isinstance(source, str) and source for source in sources):
+            raise ValueError(f"Job {i + 1} needs a list of source playlist IDs")
+        if not sources:
+            raise ValueError(f"Job {i + 1} has no source playlist")
+        if len(set(sources)) != len(sources):
+            raise ValueError(f"Job {i + 1} lists a source more than once")
+        account = entry.get("account")
+        if account not in accounts:
+            raise ValueError(f"Job {i + 1} uses unknown account {account}")
+        
+        job = {
+            "name": entry.get("name", sources[0]),
+            "account": account,
+            "source": sources[0],
+            "sources": sources,
+            "user_id": accounts[account]["user_id"],
+            "name_template": entry.get("name_template", PLAYLIST_NAME_TEMPLATE),
+            "description_template": entry.get("description_template", PLAYLIST_DESCRIPTION_TEMPLATE),
+            "share_with": entry.get("share_with")
+        }
+        if "schemes" in entry:
+            job["schemes"] = [parse_scheme(scheme) for scheme in entry["schemes"]]
+        else:
+            job["schemes"] = default_job()["schemes"]
+        scheme_names = [scheme["name"] for scheme in job["schemes"]]
+        if not scheme_names or len(set(scheme_names)) != len(scheme_names):
+            raise ValueError(f"Job {job['name']} needs period schemes with unique names")
         
-        # Filter out tracks that are already in the playlist
-        new_tracks = [track for track in tracks if track["id"] not in existing_track_ids]
+        # Catch typos in the templates now rather than halfway through a run
+        for scheme_job in job_schemes(job):
+            try:
+                scheme_job["name_template"].format(season="spring", period="spring", year=2000)
+                scheme_job["description_template"].format(season="spring", period="spring", year=2000)
+            except (KeyError, IndexError, ValueError) as e:
+                raise ValueError(f"Job {job['name']} has an invalid template: {e}")
+        jobs.append(job)
+    
+    if not jobs:
+        raise ValueError(f"Config file {path} has no jobs")
+    names = [job["name"] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Job names must be unique")
+    
+    return {
+        "workers": int(raw.get("workers", SEASON_WORKERS)),
+        "rate_limit": float(raw.get("rate_limit", RATE_LIMIT)),
+        "accounts": accounts,
+        "jobs": jobs
+    }
+
+def run_jobs(config, headless=False, full_sync=False, retroactive=False, start_year=None, dry_run=False,
+             reconcile=False):
+    """
+    Run every job in a config from load_run_config in one process.
+    
+    Each account logs in once, and all clients share one connection pool and
+    one RateLimiter, so the jobs together stay within the rate budget. Jobs
+    run on `workers` threads, slowest first according to the previous run,
+    so a long job doesn't end up starting last. With dry_run, every job is
+    only planned. reconcile only applies to retroactive runs.
+    
+    Returns:
+        (clients, number of failed jobs, plans made by dry runs)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    workers = max(1, config["workers"])
+    limiter = RateLimiter(config["rate_limit"])
+    session = make_session(pool_size=max(10, workers * max(PAGE_CONCURRENCY, SEASON_WORKERS)))
+    
+    # Log in to every account up front, so any login prompts don't interleave
+    clients = {}
+    used_accounts = {job["account"] for job in config["jobs"]}
+    with METRICS.phase("auth"):
+        for name, account in config["accounts"].items():
+            if name not in used_accounts:
+                continue
+            try:
+                clients[name] = get_spotify_client(
+                    headless=headless, refreshable=retroactive, cache_path=account["token_cache"],
+                    limiter=limiter, session=session
+                )
+            except AuthenticationRequired as e:
+                logger.error(f"Can't log in as {account['user_id']}: {e}")
+    
+    state = load_sync_state()
+    previous_seconds = state.get("job_seconds", {})
+    names = [job["name"] for job in config["jobs"]]
+    jobs = sorted(config["jobs"], key=lambda job: previous_seconds.get(job["name"], float("inf")), reverse=True)
+    
+    durations = {}
+    plans = []
+    ledger = AddLedger()
+    mirror = PlaylistMirror()
+    
+    def run_job(job):
+        sp = clients.get(job["account"])
+        if sp is None:
+            logger.error(f"Skipping job {job['name']}, its account isn't logged in")
+            return False
         
-        if new_tracks:
-            # Add tracks to the playlist
-            track_uris = [track["uri"] for track in new_tracks]
+        # Log lines are prefixed with the thread name
+        threading.current_thread().name = job["name"]
+        start = time.perf_counter()
+        try:
+            if dry_run:
+                plans.extend(make_plans(sp, retroactive, start_year, full_sync, job, ledger, mirror, reconcile))
+            elif retroactive:
+                create_retroactive_seasonal_playlists(
+                    sp, start_year, job=job, ledger=ledger, mirror=mirror, reconcile=reconcile, full_sync=full_sync
+                )
+            else:
+                update_seasonal_playlist(sp, full_sync=full_sync, job=job, ledger=ledger, mirror=mirror)
+                check_for_season_change(sp, job=job)
+            return True
+        except Exception as e:
+            logger.error(f"Error running job {job['name']}: {e}")
+            return False
+        finally:
+            durations[job["name"]] = time.perf_counter() - start
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_job, jobs))
+    finally:
+        ledger.close()
+        mirror.close()
+    
+    update_sync_state({"job_seconds": {**previous_seconds, **durations}})
+    # Keep the plans in config order
+    plans.sort(key=lambda plan: names.index(plan["job"]["name"]))
+    return list(clients.values()), results.count(False), plans
+
+def report_dry_run(plans, path=None):
+    """Log the plans of a --dry-run and save them to path if given."""
+    for plan in plans:
+        describe_plan(plan)
+    if path:
+        write_plans(plans, path)
+    logger.info("Dry run, nothing was written to Spotify")
+
+def write_run_report(*clients):
+    """Log a summary of the run's API usage and write the configured run reports."""
+    stats = {}
+    for sp in clients:
+        for key, value in getattr(sp, "stats", {}).items():
+            stats[key] = stats.get(key, 0) + value
+    if stats:
+        logger.info(
+            f"API calls: {stats['calls']} ({stats['throttled']} throttled, "
+            f"{stats['retried']} retried, {stats['failed']} failed)"
+        )
+    
+    report = METRICS.report()
+    revalidated = sum(endpoint["statuses"].get("304", 0) for endpoint in report["api"]["endpoints"].values())
+    if revalidated:
+        logger.info(f"Served {revalidated} unchanged responses from the HTTP cache")
+    for name, seconds in report["phases"].items():
+        logger.debug(f"  {name}: {seconds:.2f}s")
+    for endpoint, endpoint_stats in report["api"]["endpoints"].items():
+        logger.debug(
+            f"  {endpoint}: {endpoint_stats['calls']} calls, {endpoint_stats['bytes']} bytes, "
+            f"{endpoint_stats['seconds']:.2f}s"
+        )
+    
+    if RUN_REPORT_PATH:
+        METRICS.write_json(RUN_REPORT_PATH)
+        logger.info(f"Wrote run report to {RUN_REPORT_PATH}")
+    if PROMETHEUS_TEXTFILE_PATH:
+        METRICS.write_prometheus(PROMETHEUS_TEXTFILE_PATH)
+
+def start_token_refresher(auth_manager, margin=TOKEN_REFRESH_MARGIN):
+    """Refresh the access token in a background thread shortly before it expires."""
+    def refresh_loop():
+        while True:
+            token_info = auth_manager.cache_handler.get_cached_token()
+            if not token_info:
+                time.sleep(60)
+                continue
             
-            # Spotify has a limit of 100 tracks per request
-            for i in range(0, len(track_uris), 100):
-                batch = track_uris[i:i+100]
-                sp.playlist_add_items(playlist_id, batch)
+            remaining = token_info["expires_at"] - time.time()
+            if remaining <= margin:
+                try:
+                    auth_manager.refresh_access_token(token_info["refresh_token"])
+                    logger.info("Refreshed Spotify access token")
+                    continue
+                except Exception as e:
+                    logger.error(f"Error refreshing access token: {e}")
+                    remaining = margin + 60
             
-            print(f"Added {len(new_tracks)} tracks to {season} {year} playlist")
+            time.sleep(max(30, remaining - margin))
+    
+    thread = threading.Thread(target=refresh_loop, name="token-refresher", daemon=True)
+    thread.start()
+    return thread
+
+def run_daemon(sp):
+    """
+    Keep running, polling the main playlist and creating playlists as seasons begin.
+    
+    One client (and its connection pool) is reused for every poll. The poll
+    interval doubles while the main playlist is unchanged and drops back to
+    DAEMON_MIN_INTERVAL after a change. The loop also wakes exactly at the next
+    season boundary of any period scheme to create that season's playlist.
+    """
+    start_token_refresher(sp.auth_manager)
+    
+    job = default_job()
+    interval = DAEMON_MIN_INTERVAL
+    boundary_job, next_boundary = next_period_start(job, time.time())
+    logger.info(f"Daemon started, next season begins {next_boundary['date']}")
+    
+    while True:
+        try:
+            changed = update_seasonal_playlist(sp, job=job)
+        except Exception as e:
+            # Keep the daemon alive; the next poll will try again
+            logger.error(f"Error updating seasonal playlist: {e}")
+            changed = False
+        
+        interval = DAEMON_MIN_INTERVAL if changed else min(interval * 2, DAEMON_MAX_INTERVAL)
+        
+        # Keep the Prometheus textfile current between polls
+        if PROMETHEUS_TEXTFILE_PATH:
+            METRICS.write_prometheus(PROMETHEUS_TEXTFILE_PATH)
+        
+        # Sleep until the next poll, or until the season boundary if that comes first
+        until_boundary = next_boundary['timestamp'] - time.time()
+        if until_boundary <= interval:
+            time.sleep(max(0, until_boundary))
+            try:
+                check_for_season_change(sp, next_boundary, boundary_job)
+            except Exception as e:
+                logger.error(f"Error creating playlist for new season: {e}")
+            boundary_job, next_boundary = next_period_start(job, time.time())
+            logger.info(f"Next season begins {next_boundary['date']}")
+            interval = DAEMON_MIN_INTERVAL
         else:
-            print(f"No new tracks to add to {season} {year} playlist")
+            logger.info(f"Next poll in {interval}s")
+            time.sleep(interval)
 
-def main():
-    """Main function to run the bot."""
-    sp = get_spotify_client()
+def parse_args(argv=None):
+    """
+    Parse the command line, rejecting flags that don't work together.
+    
+    Args:
+        argv: Arguments to parse, sys.argv[1:] if None
+        
+    Returns:
+        argparse.Namespace: The parsed arguments, with start_year set from either
+        the positional argument or --start-year
+    """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Keep seasonal playlists of a main Spotify playlist")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--retroactive", action="store_true", help="Create playlists for every past season")
+    mode.add_argument("--season-report", action="store_true", help="Log stats for every past season")
+    mode.add_argument("--daemon", action="store_true", help="Keep running and poll the main playlist")
+    parser.add_argument("year", type=int, nargs="?", help="First year for --retroactive or --season-report")
+    parser.add_argument("--start-year", type=int, help="Same as the positional year")
+    parser.add_argument("--config", help="JSON file of jobs to run")
+    parser.add_argument("--dry-run", action="store_true", help="Plan the additions without writing them")
+    parser.add_argument("--plan", help="With --dry-run, also save the plan as JSON here")
+    parser.add_argument("--json", help="With --season-report, also save the report as JSON here")
+    parser.add_argument("--full-sync", action="store_true", help="Read the main playlist again from scratch")
+    parser.add_argument("--reconcile", action="store_true", help="With --retroactive, repair existing playlists")
+    parser.add_argument("--headless", action="store_true", help="Fail instead of waiting for a login")
+    parser.add_argument("--verbose", action="store_true", help="Log per-page and per-track details")
+    args = parser.parse_args(argv)
     
-    # Check for command line arguments
+    if args.year is not None and args.start_year is not None:
+        parser.error("give the start year either positionally or with --start-year, not both")
+    args.start_year = args.year if args.year is not None else args.start_year
+    if args.start_year is not None and not (args.retroactive or args.season_report):
+        parser.error("a start year only works with --retroactive or --season-report")
+    if args.reconcile and not args.retroactive:
+        parser.error("--reconcile only works with --retroactive")
+    if args.plan and not args.dry_run:
+        parser.error("--plan only works with --dry-run")
+    if args.json and not args.season_report:
+        parser.error("--json only works with --season-report")
+    if args.config and args.season_report:
+        parser.error("--season-report covers the playlist configured by SPOTIPY_* and can't be combined with --config")
+    if args.config and args.daemon:
+        parser.error("--daemon runs the single playlist configured by SPOTIPY_* and can't be combined with --config")
+    if args.dry_run and (args.daemon or args.season_report):
+        parser.error("--dry-run only works with a regular run, --retroactive or --config")
+    return args
+
+def main(argv=None):
+    """Main function to run the bot."""
     import sys
-    if len(sys.argv) > 1 and sys.argv[1] == "--retroactive":
-        # If a start year is provided, use it
-        start_year = int(sys.argv[2]) if len(sys.argv) > 2 else None
-        create_retroactive_seasonal_playlists(sp, start_year)
-        print("Retroactive playlist creation completed")
+    
+    args = parse_args(argv)
+    
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else LOG_LEVEL.upper(),
+        # Jobs from a config file run side by side, so say which one each line is from
+        format="%(threadName)s: %(message)s" if args.config else "%(message)s"
+    )
+    # Failed API calls are retried or re-raised by ThrottledSpotify, so spotipy's
+    # own error logging would only duplicate them
+    logging.getLogger("spotipy.client").setLevel(logging.CRITICAL)
+    
+    METRICS.add_phase("startup", time.perf_counter() - _STARTED_AT)
+    
+    # Never wait on a login prompt nobody can answer, e.g. under cron or systemd
+    headless = args.headless or os.getenv("SPOTIPY_HEADLESS") == "1" or not sys.stdin.isatty()
+    # Retroactive and daemon runs can outlive the cached token, so they need the refreshing auth manager
+    refreshable = args.retroactive or args.daemon
+    
+    if args.config:
+        try:
+            config = load_run_config(args.config)
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(2)
+        
+        clients, failed, plans = run_jobs(
+            config, headless=headless, full_sync=args.full_sync,
+            retroactive=args.retroactive, start_year=args.start_year, dry_run=args.dry_run, reconcile=args.reconcile
+        )
+        logger.info(f"Ran {len(config['jobs'])} jobs, {failed} failed")
+        if args.dry_run:
+            report_dry_run(plans, args.plan)
+        write_run_report(*clients)
+        if failed:
+            sys.exit(1)
+        return
+    
+    with METRICS.phase("auth"):
+        try:
+            sp = get_spotify_client(headless=headless, refreshable=refreshable)
+        except AuthenticationRequired as e:
+            logger.error(str(e))
+            sys.exit(1)
+    
+    if args.season_report:
+        report = build_season_report(sp, args.start_year)
+        logger.info(format_season_report(report))
+        if args.json:
+            write_file_atomically(args.json, json.dumps(report, indent=2))
+            logger.info(f"Wrote season report to {args.json}")
+        write_run_report(sp)
+        return
+    
+    if args.dry_run:
+        plans = make_plans(sp, args.retroactive, args.start_year, args.full_sync, reconcile=args.reconcile)
+        report_dry_run(plans, args.plan)
+        write_run_report(sp)
+        return
+    
+    if args.retroactive:
+        create_retroactive_seasonal_playlists(
+            sp, args.start_year, reconcile=args.reconcile, full_sync=args.full_sync
+        )
+        logger.info("Retroactive playlist creation completed")
+        write_run_report(sp)
+        return
+    
+    if args.daemon:
+        try:
+            run_daemon(sp)
+        except KeyboardInterrupt:
+            logger.info("Daemon stopped")
+            write_run_report(sp)
         return
     
-    # Update the current seasonal playlist
-    update_seasonal_playlist(sp)
+    # Update the current seasonal playlist, ignoring the saved sync state if asked to
+    update_seasonal_playlist(sp, full_sync=args.full_sync)
     
     # Check if we need to create the next season's playlist
     check_for_season_change(sp)
     
-    print(f"Bot run completed at {datetime.now()}")
+    logger.info(f"Bot run completed at {datetime.now()}")
+    write_run_report(sp)
 
 if __name__ == "__main__":
     main()
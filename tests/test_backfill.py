@@ -0,0 +1,117 @@
+"""Tests for streaming a retroactive backfill against the fake API."""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+import spotipy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_spotify
+import main
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "MAIN_PLAYLIST_ID", fake_spotify.MAIN_PLAYLIST_ID)
+    monkeypatch.setattr(main, "USER_ID", fake_spotify.USER_ID)
+    monkeypatch.setattr(main, "EXTRA_SOURCES", "")
+    monkeypatch.setattr(main, "SEASON_TIMEZONE", "UTC")
+    monkeypatch.setattr(main, "BACKFILL_BUFFER", 300)
+    main._playlist_indexes.clear()
+    api = fake_spotify.FakeSpotify()
+    server = fake_spotify.FakeSpotifyServer(api)
+    server.start()
+    yield api
+    server.stop()
+    main._playlist_indexes.clear()
+
+
+def backfill(api, start_year):
+    sp = spotipy.Spotify(auth="token")
+    sp.prefix = api.base_url + "/v1/"
+    sp = main.wrap_spotify_client(sp, main.RateLimiter(1000, burst=100))
+    ledger = main.AddLedger("ledger.db")
+    mirror = main.PlaylistMirror("mirror.db")
+    main.stream_retroactive_backfill(sp, start_year, ledger=ledger, mirror=mirror)
+    cached = len(ledger._track_ids)
+    ledger.close()
+    mirror.close()
+    return cached
+
+
+def expected_playlists(api, start_year):
+    # Each season's tracks once each, in main playlist order
+    season_calendar = main.get_season_calendar(start_year - 1, datetime.utcnow().year + 1)
+    playlists = {}
+    for track_id, added_at, _ in api.playlists[fake_spotify.MAIN_PLAYLIST_ID]["items"]:
+        i = season_calendar.period_at(main.parse_timestamp(added_at))
+        boundary = season_calendar.boundaries[i]
+        name = main.PLAYLIST_NAME_TEMPLATE.format(season=boundary["name"], year=boundary["year"])
+        if track_id not in playlists.setdefault(name, []):
+            playlists[name].append(track_id)
+    return playlists
+
+
+def seasonal_playlists(api):
+    return {
+        playlist["name"]: [track_id for track_id, _, _ in playlist["items"]]
+        for playlist_id, playlist in api.playlists.items() if playlist_id != fake_spotify.MAIN_PLAYLIST_ID
+    }
+
+
+def test_seasons_are_closed_as_the_stream_passes_them(api):
+    end = datetime.utcnow()
+    api.add_playlist("main", 2000, start=end - timedelta(days=730), end=end, playlist_id=fake_spotify.MAIN_PLAYLIST_ID)
+    backfill(api, end.year - 2)
+    assert seasonal_playlists(api) == expected_playlists(api, end.year - 2)
+    
+    # Once the playlists exist, only the current season's contents are still loaded when the stream ends
+    cached = backfill(api, end.year - 2)
+    assert seasonal_playlists(api) == expected_playlists(api, end.year - 2)
+    assert cached == 1
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_tracks_arriving_after_their_season_closed_reopen_it(api, seed):
+    end = datetime.utcnow()
+    api.add_playlist("main", 1500, start=end - timedelta(days=730), end=end, playlist_id=fake_spotify.MAIN_PLAYLIST_ID)
+    items = api.playlists[fake_spotify.MAIN_PLAYLIST_ID]["items"]
+    rng = random.Random(seed)
+    # A reordered main playlist, with some tracks in it twice
+    items.extend(rng.sample(items, 100))
+    rng.shuffle(items)
+    
+    backfill(api, end.year - 2)
+    assert seasonal_playlists(api) == expected_playlists(api, end.year - 2)
+    
+    # A rerun finds nothing left to add
+    api.stats.clear()
+    backfill(api, end.year - 2)
+    assert not [endpoint for endpoint in api.stats if endpoint.startswith("POST")]
+
+
+def test_reconcile_orders_repeated_tracks_by_their_place_in_each_season(api):
+    end = datetime.utcnow()
+    api.add_playlist("main", 600, start=end - timedelta(days=730), end=end, playlist_id=fake_spotify.MAIN_PLAYLIST_ID)
+    items = api.playlists[fake_spotify.MAIN_PLAYLIST_ID]["items"]
+    rng = random.Random(0)
+    rng.shuffle(items)
+    # Tracks added again a season or more later, at the end of the main playlist
+    for track_id, added_at, adder in rng.sample(items, 60):
+        later = main.parse_timestamp(added_at) + rng.randint(100, 300) * 86400
+        if later < end.timestamp():
+            items.append((track_id, main.format_timestamp(later), adder))
+    
+    sp = spotipy.Spotify(auth="token")
+    sp.prefix = api.base_url + "/v1/"
+    sp = main.wrap_spotify_client(sp, main.RateLimiter(1000, burst=100))
+    ledger = main.AddLedger("ledger.db")
+    mirror = main.PlaylistMirror("mirror.db")
+    main.create_retroactive_seasonal_playlists(sp, end.year - 2, ledger=ledger, mirror=mirror, reconcile=True)
+    ledger.close()
+    mirror.close()
+    assert seasonal_playlists(api) == expected_playlists(api, end.year - 2)
@@ -0,0 +1,44 @@
+"""Tests for PeriodCalendar lookups: period_at, classify and bucket."""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+def calendar():
+    # Periods a, b, then a gap, then c, ending at 100
+    return main.PeriodCalendar([(10, "a"), (20, "b"), (40, None), (60, "c"), (100, "end")], "UTC")
+
+
+@pytest.mark.parametrize("timestamp, period", [
+    (0, None), (10, 0), (19, 0), (20, 1), (39, 1), (40, None), (59, None), (60, 3), (99, 3), (100, None), (500, None),
+])
+def test_period_at(timestamp, period):
+    assert calendar().period_at(timestamp) == period
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_classify_matches_period_at(seed):
+    rng = random.Random(seed)
+    season_calendar = calendar()
+    timestamps = [rng.randint(-10, 120) for _ in range(200)]
+    expected = [season_calendar.period_at(timestamp) for timestamp in timestamps]
+    assert season_calendar.classify(timestamps) == expected
+    # Sorted input takes the single-pass walk instead of a search per timestamp
+    timestamps.sort()
+    assert season_calendar.classify(timestamps) == [season_calendar.period_at(timestamp) for timestamp in timestamps]
+
+
+def test_classify_empty():
+    assert calendar().classify([]) == []
+
+
+def test_bucket_leaves_out_gaps_and_outside_tracks():
+    tracks = [main.Track(str(added_at), "", added_at) for added_at in [5, 10, 15, 20, 45, 60, 99, 100]]
+    buckets = calendar().bucket(tracks)
+    assert [[track.added_at for track in bucket] for bucket in buckets] == [[10, 15], [20], [], [60, 99]]
@@ -0,0 +1,49 @@
+"""Tests for parsing the command line."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+@pytest.mark.parametrize("argv, start_year", [
+    (["--retroactive", "2020"], 2020),
+    (["--retroactive", "--start-year", "2020"], 2020),
+    (["--start-year", "2021", "--season-report"], 2021),
+    (["--dry-run", "--retroactive", "2020", "--reconcile"], 2020),
+    (["--retroactive"], None),
+])
+def test_start_year_in_any_position(argv, start_year):
+    args = main.parse_args(argv)
+    assert args.start_year == start_year
+
+
+def test_regular_run_flags():
+    args = main.parse_args(["--full-sync", "--headless", "--config", "jobs.json"])
+    assert args.full_sync and args.headless and args.config == "jobs.json"
+    assert not args.retroactive and args.start_year is None
+
+
+@pytest.mark.parametrize("argv", [
+    ["--retroactive", "--season-report"],
+    ["--retroactive", "--daemon"],
+    ["--retroactive", "2020", "--start-year", "2021"],
+    ["2020"],
+    ["--daemon", "--start-year", "2020"],
+    ["--reconcile"],
+    ["--retroactive", "nineteen"],
+    ["--config"],
+    ["--config", "jobs.json", "--daemon"],
+    ["--config", "jobs.json", "--season-report"],
+    ["--plan", "plan.json"],
+    ["--json", "report.json"],
+    ["--daemon", "--dry-run"],
+    ["--full-sync", "--unknown"],
+])
+def test_rejects_unknown_and_conflicting_flags(argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main.parse_args(argv)
+    assert exit_info.value.code == 2
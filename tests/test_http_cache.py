@@ -0,0 +1,51 @@
+"""Tests for revalidating GET responses against the ResponseCache."""
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_spotify
+import main
+
+
+@pytest.fixture
+def server():
+    api = fake_spotify.FakeSpotify()
+    api.add_playlist("main", 10, playlist_id=fake_spotify.MAIN_PLAYLIST_ID)
+    api.add_saved_tracks(10)
+    server = fake_spotify.FakeSpotifyServer(api)
+    yield server.start()
+    server.stop()
+
+
+@pytest.fixture
+def session(tmp_path):
+    cache = main.ResponseCache(str(tmp_path / "http_cache.db"))
+    session = requests.Session()
+    session.mount("http://", main.make_caching_adapter(cache))
+    yield session
+    cache.close()
+
+
+def get(session, url, token):
+    response = session.get(url, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    return getattr(response, "revalidated", False)
+
+
+def test_playlist_pages_are_shared_between_tokens(server, session):
+    url = f"{server}/v1/playlists/{fake_spotify.MAIN_PLAYLIST_ID}/tracks?offset=0&limit=100"
+    assert not get(session, url, "first")
+    assert get(session, url, "second")
+
+
+def test_me_endpoints_are_cached_per_token(server, session):
+    url = f"{server}/v1/me/tracks?offset=0&limit=50"
+    assert not get(session, url, "first")
+    assert get(session, url, "first")
+    # Another account's token must not be answered with the first account's Liked Songs
+    assert not get(session, url, "second")
+    assert get(session, url, "second")
@@ -0,0 +1,120 @@
+"""Tests for AddLedger: recording batches and recovering from an interrupted run."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+class Interrupted(BaseException):
+    """Stands in for the process being killed mid-request."""
+
+
+class StubClient:
+    """One playlist whose adds land, and optionally interrupt the run on a given call."""
+
+    def __init__(self, track_ids=(), interrupt_on=None):
+        self.track_ids = list(track_ids)
+        self.interrupt_on = interrupt_on
+        self.adds = 0
+
+    def playlist_items(self, playlist_id, fields=None, additional_types=None, limit=100):
+        return {"items": [{"track": {"id": track_id}} for track_id in self.track_ids], "next": None}
+
+    def playlist_add_items(self, playlist_id, uris):
+        self.adds += 1
+        self.track_ids.extend(uri.split(":")[-1] for uri in uris)
+        if self.adds == self.interrupt_on:
+            # The batch landed, but the run died before hearing back
+            raise Interrupted()
+        return {"snapshot_id": f"s{self.adds}"}
+
+
+@pytest.fixture
+def new_process(monkeypatch):
+    """Forget which ledgers this process has recovered, as if it had just started."""
+    def start():
+        monkeypatch.setattr(main, "_recovered_ledgers", set())
+    start()
+    return start
+
+
+def add_missing(sp, ledger, wanted):
+    # What a run does for each seasonal playlist: read it once if needed, then add what's missing
+    if not ledger.is_seeded("playlist"):
+        ledger.seed("playlist", main.get_playlist_track_ids(sp, "playlist"))
+    existing = ledger.track_ids("playlist")
+    main.add_tracks_to_playlist(sp, "playlist", [track_id for track_id in wanted if track_id not in existing], ledger)
+
+
+def test_pending_batch_is_only_recovered_on_the_first_open_per_process(tmp_path, new_process):
+    path = str(tmp_path / "ledger.db")
+    ledger = main.AddLedger(path)
+    ledger.seed("playlist", ["a"])
+    ledger.begin_batch("playlist", ["b", "c"])
+    ledger.close()
+
+    # Later opens in the same process leave batches in flight alone
+    ledger = main.AddLedger(path)
+    assert ledger.is_seeded("playlist")
+    assert ledger.conn.execute("SELECT COUNT(*) FROM batches WHERE status = 'pending'").fetchone()[0] == 1
+    ledger.close()
+
+    new_process()
+    ledger = main.AddLedger(path)
+    assert not ledger.is_seeded("playlist")
+    assert ledger.conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0] == 0
+    ledger.close()
+
+    # Recovery happened once, so opening it again in this process keeps the playlist's state
+    ledger = main.AddLedger(path)
+    ledger.seed("playlist", ["a", "b", "c"])
+    ledger.close()
+    ledger = main.AddLedger(path)
+    assert ledger.is_seeded("playlist")
+    ledger.close()
+
+
+def test_rerun_after_an_interrupted_batch_adds_no_duplicates(tmp_path, new_process):
+    path = str(tmp_path / "ledger.db")
+    wanted = [f"t{i}" for i in range(350)]
+    sp = StubClient(["t0"], interrupt_on=2)
+
+    ledger = main.AddLedger(path)
+    with pytest.raises(Interrupted):
+        add_missing(sp, ledger, wanted)
+    ledger.close()
+    assert len(sp.track_ids) == 201
+
+    new_process()
+    sp.interrupt_on = None
+    ledger = main.AddLedger(path)
+    add_missing(sp, ledger, wanted)
+    assert sp.track_ids == wanted
+    assert ledger.track_ids("playlist") == set(wanted)
+    ledger.close()
+
+    # A further rerun has nothing left to add
+    adds = sp.adds
+    ledger = main.AddLedger(path)
+    add_missing(sp, ledger, wanted)
+    assert sp.adds == adds
+    ledger.close()
+
+
+def test_failed_batch_is_abandoned_and_the_playlist_read_again(tmp_path, new_process):
+    ledger = main.AddLedger(str(tmp_path / "ledger.db"))
+    ledger.seed("playlist", [])
+
+    class Failing(StubClient):
+        def playlist_add_items(self, playlist_id, uris):
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        main.add_tracks_to_playlist(Failing(), "playlist", ["a"], ledger)
+    assert not ledger.is_seeded("playlist")
+    assert ledger.conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0] == 0
+    ledger.close()
@@ -0,0 +1,220 @@
+"""Tests for PlaylistMirror: incremental syncs, falling back to full reads, and range queries."""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+PLAYLIST_ID = "main"
+DAY = 86400
+
+
+def item(track_id, added_at):
+    return {
+        "added_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(added_at)),
+        "added_by": {"id": "adder"},
+        "track": {"id": track_id, "name": f"name {track_id}", "duration_ms": 1000, "artists": [{"id": "artist"}]}
+    }
+
+
+class StubClient:
+    """Serves one playlist and the Liked Songs from lists of (track ID, added_at), recording the pages read."""
+
+    def __init__(self, count=0):
+        self.items = []
+        self.saved = []
+        self.version = 0
+        self.pages = []
+        self.append(count)
+
+    def append(self, count):
+        start = len(self.items)
+        self.items.extend((f"t{i}", 1_700_000_000 + i * DAY) for i in range(start, start + count))
+        self.version += 1
+
+    def remove(self, position):
+        del self.items[position]
+        self.version += 1
+
+    def like(self, count):
+        start = len(self.saved) and int(self.saved[-1][0][1:]) + 1
+        self.saved.extend((f"l{i}", 1_700_000_000 + i * DAY) for i in range(start, start + count))
+
+    def playlist(self, playlist_id, fields=None):
+        return {"snapshot_id": f"s{self.version}", "tracks": {"total": len(self.items)}}
+
+    def playlist_items(self, playlist_id, fields=None, additional_types=None, offset=0, limit=100):
+        self.pages.append(offset)
+        page = self.items[offset:offset + limit]
+        return {
+            "items": [item(track_id, added_at) for track_id, added_at in page],
+            "total": len(self.items),
+            "next": "next" if offset + limit < len(self.items) else None
+        }
+
+    def current_user_saved_tracks(self, limit=20, offset=0):
+        self.pages.append(offset)
+        newest_first = self.saved[::-1]
+        return {
+            "items": [item(track_id, added_at) for track_id, added_at in newest_first[offset:offset + limit]],
+            "total": len(self.saved),
+            "next": "next" if offset + limit < len(self.saved) else None
+        }
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    mirror = main.PlaylistMirror(str(tmp_path / "mirror.db"))
+    yield mirror
+    mirror.close()
+
+
+def mirrored_ids(mirror):
+    return [track.id for track in mirror.tracks(PLAYLIST_ID)]
+
+
+def wanted_ids(sp):
+    return [track_id for track_id, _ in sp.items]
+
+
+def test_first_sync_reads_everything(mirror):
+    sp = StubClient(250)
+    assert mirror.sync(sp, PLAYLIST_ID) == "s1"
+    assert sorted(sp.pages) == [0, 100, 200]
+    assert mirrored_ids(mirror) == wanted_ids(sp)
+
+
+def test_unchanged_snapshot_reads_no_pages(mirror):
+    sp = StubClient(250)
+    mirror.sync(sp, PLAYLIST_ID)
+    sp.pages.clear()
+    assert mirror.sync(sp, PLAYLIST_ID) == "s1"
+    assert sp.pages == []
+
+
+def test_appends_only_read_the_tail(mirror):
+    sp = StubClient(250)
+    mirror.sync(sp, PLAYLIST_ID)
+    sp.pages.clear()
+    sp.append(120)
+    assert mirror.sync(sp, PLAYLIST_ID) == "s2"
+    # The page holding the last mirrored item, then the new ones
+    assert sp.pages == [200, 300]
+    assert mirrored_ids(mirror) == wanted_ids(sp)
+
+
+def test_appends_check_the_last_item_is_still_in_place(mirror):
+    sp = StubClient(250)
+    mirror.sync(sp, PLAYLIST_ID)
+    # The total goes up, but the last mirrored item has moved down by one
+    sp.items.insert(0, ("new", 1_600_000_000))
+    sp.append(5)
+    sp.pages.clear()
+    mirror.sync(sp, PLAYLIST_ID)
+    assert 0 in sp.pages
+    assert mirrored_ids(mirror) == wanted_ids(sp)
+
+
+def test_removals_fall_back_to_a_full_read(mirror):
+    sp = StubClient(250)
+    mirror.sync(sp, PLAYLIST_ID)
+    sp.remove(10)
+    sp.pages.clear()
+    mirror.sync(sp, PLAYLIST_ID)
+    assert sorted(sp.pages) == [0, 100, 200]
+    assert mirrored_ids(mirror) == wanted_ids(sp)
+    assert "t10" not in mirrored_ids(mirror)
+
+
+def test_full_sync_reads_everything_again(mirror):
+    sp = StubClient(150)
+    mirror.sync(sp, PLAYLIST_ID)
+    sp.pages.clear()
+    mirror.sync(sp, PLAYLIST_ID, full=True)
+    assert sorted(sp.pages) == [0, 100]
+
+
+def test_since_reads_back_only_as_far_as_needed(mirror):
+    sp = StubClient(450)
+    since = sp.items[320][1]
+    mirror.sync(sp, PLAYLIST_ID, since=since)
+    # Pages are read backwards until one starts before since
+    assert sp.pages == [400, 300]
+    assert [track.id for track in mirror.tracks(PLAYLIST_ID, start=since)] == wanted_ids(sp)[320:]
+
+    # Asking for older items extends the copy backwards without reading the newer pages again
+    sp.pages.clear()
+    mirror.sync(sp, PLAYLIST_ID, since=sp.items[150][1])
+    assert sp.pages == [200, 100]
+    sp.pages.clear()
+    mirror.sync(sp, PLAYLIST_ID)
+    assert sp.pages == [0]
+    assert mirrored_ids(mirror) == wanted_ids(sp)
+
+
+def test_range_queries(mirror):
+    sp = StubClient(300)
+    sp.items.append(sp.items[5])
+    sp.version += 1
+    mirror.sync(sp, PLAYLIST_ID)
+    start, end = sp.items[100][1], sp.items[110][1]
+    assert [track.id for track in mirror.tracks(PLAYLIST_ID, start, end)] == wanted_ids(sp)[100:110]
+    assert [track.id for track in mirror.tracks(PLAYLIST_ID, start, newest_first=True, limit=3)] == \
+        ["t299", "t298", "t297"]
+    # A repeated track is returned at both positions by tracks, and once by track_details
+    assert [track.id for track in mirror.tracks(PLAYLIST_ID, end=sp.items[6][1])].count("t5") == 2
+    assert [details["track_id"] for details in mirror.track_details(PLAYLIST_ID, end=sp.items[6][1])] == \
+        [f"t{i}" for i in range(6)]
+    assert mirror.first_positions(PLAYLIST_ID)["t5"] == 5
+    assert mirror.first_added_at(PLAYLIST_ID) == sp.items[0][1]
+
+
+LIKED_ID = f"{main.LIKED_SONGS}:user"
+
+
+def test_liked_songs_snapshot_is_total_newest_id_and_added_at(mirror):
+    sp = StubClient()
+    sp.like(120)
+    assert mirror.sync(sp, LIKED_ID) == f"120:l119:{item('l119', sp.saved[-1][1])['added_at']}"
+    # The first page stands in for the metadata request, so an unchanged copy costs just that page
+    sp.pages.clear()
+    assert mirror.sync(sp, LIKED_ID) == f"120:l119:{item('l119', sp.saved[-1][1])['added_at']}"
+    assert sp.pages == [0]
+
+
+def test_liked_songs_are_positioned_oldest_first(mirror):
+    sp = StubClient()
+    sp.like(120)
+    mirror.sync(sp, LIKED_ID)
+    assert mirror.first_positions(LIKED_ID) == {f"l{i}": i for i in range(120)}
+
+
+def test_new_likes_only_read_the_pages_before_the_last_one_we_have(mirror):
+    sp = StubClient()
+    sp.like(300)
+    mirror.sync(sp, LIKED_ID)
+    sp.like(70)
+    sp.pages.clear()
+    mirror.sync(sp, LIKED_ID)
+    # The newest like we had is now at offset 70, on the second page
+    assert sp.pages == [0, 50]
+    assert mirror.first_positions(LIKED_ID) == {f"l{i}": i for i in range(370)}
+    assert [track.id for track in mirror.tracks(LIKED_ID)] == [f"l{i}" for i in range(370)]
+
+
+def test_unliking_falls_back_to_reading_the_liked_songs_again(mirror):
+    sp = StubClient()
+    sp.like(120)
+    mirror.sync(sp, LIKED_ID)
+    # Unliking a song shifts the newest like we have, as seen from the newest end
+    del sp.saved[50]
+    sp.like(3)
+    sp.pages.clear()
+    mirror.sync(sp, LIKED_ID)
+    assert sorted(sp.pages) == [0, 50, 100]
+    assert mirror.first_positions(LIKED_ID) == {track_id: i for i, (track_id, _) in enumerate(sp.saved)}
@@ -0,0 +1,112 @@
+"""Tests for the per-user playlist index and finding or creating seasonal playlists."""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+class StubClient:
+    """Lists and creates playlists in memory, optionally blocking one user's listing until released."""
+    
+    def __init__(self, playlists=(), blocked_user=None):
+        self.playlists = list(playlists)
+        self.blocked_user = blocked_user
+        self.release = threading.Event()
+        self.listings = []
+        self.created = []
+        self.shared = []
+        self.lock = threading.Lock()
+    
+    def current_user_playlists(self, limit=50):
+        user_id = threading.current_thread().user_id
+        self.listings.append(user_id)
+        if user_id == self.blocked_user:
+            assert self.release.wait(5)
+        items = [{"id": pid, "name": name, "owner": {"id": owner}} for pid, name, owner in self.playlists]
+        return {"items": items, "next": None}
+    
+    def user_playlist_create(self, user, name, public, description):
+        # Slow enough that concurrent callers would both create it without the lock
+        time.sleep(0.05)
+        with self.lock:
+            playlist_id = f"created{len(self.created)}"
+            self.created.append(name)
+        return {"id": playlist_id}
+    
+    def _put(self, url, payload=None):
+        self.shared.append(url)
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes(monkeypatch):
+    monkeypatch.setattr(main, "PLAYLIST_INDEX_TTL", 0)
+    main._playlist_indexes.clear()
+    yield
+    main._playlist_indexes.clear()
+
+
+def job(user_id):
+    return {**main.default_job(), "user_id": user_id, "name_template": "{season} {year}", "share_with": None}
+
+
+def run(target, user_id, *args):
+    def body():
+        threading.current_thread().user_id = user_id
+        target(*args)
+    thread = threading.Thread(target=body)
+    thread.start()
+    return thread
+
+
+def test_listing_one_user_does_not_hold_up_another():
+    sp = StubClient([("a1", "spring 2024", "alice"), ("b1", "spring 2024", "bob")], blocked_user="alice")
+    alice = run(main.get_playlist_index, "alice", sp, "alice")
+    while "alice" not in sp.listings:
+        time.sleep(0.001)
+    
+    bob = run(main.get_playlist_index, "bob", sp, "bob")
+    bob.join(5)
+    assert not bob.is_alive()
+    assert main._playlist_indexes["bob"] == {"spring 2024": "b1"}
+    
+    sp.release.set()
+    alice.join(5)
+    assert main._playlist_indexes["alice"] == {"spring 2024": "a1"}
+
+
+def test_index_is_listed_once_per_user():
+    sp = StubClient([("a1", "spring 2024", "alice")])
+    threads = [run(main.get_playlist_index, "alice", sp, "alice") for _ in range(8)]
+    for thread in threads:
+        thread.join(5)
+    assert sp.listings == ["alice"]
+
+
+def test_concurrent_workers_create_a_playlist_once():
+    sp = StubClient()
+    results = []
+    
+    def create(season):
+        results.append((season, main.find_or_create_seasonal_playlist(sp, season, 2024, job("alice"))))
+    
+    threads = [run(create, "alice", season) for season in ["spring", "summer"] * 4]
+    for thread in threads:
+        thread.join(5)
+    assert sorted(sp.created) == ["spring 2024", "summer 2024"]
+    assert len({playlist_id for season, playlist_id in results if season == "spring"}) == 1
+    assert main._playlist_indexes["alice"] == {name: f"created{i}" for i, name in enumerate(sp.created)}
+
+
+@pytest.mark.parametrize("share_with, shared", [(None, []), ("kotoha", ["playlists/created0/followers"])])
+def test_new_playlists_are_only_shared_when_the_job_says_so(share_with, shared):
+    sp = StubClient()
+    sharing_job = {**job("alice"), "share_with": share_with}
+    run(main.find_or_create_seasonal_playlist, "alice", sp, "spring", 2024, sharing_job).join(5)
+    assert sp.created == ["spring 2024"]
+    assert sp.shared == shared
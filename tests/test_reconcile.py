@@ -0,0 +1,132 @@
+"""Tests for planning seasonal playlist reconciliation: the LIS step, plan_moves and plan_reconciliation."""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+def apply_moves(items, moves):
+    """Apply playlist_reorder_items calls to a list the way Spotify does."""
+    items = list(items)
+    for range_start, insert_before, range_length in moves:
+        block = items[range_start:range_start + range_length]
+        del items[range_start:range_start + range_length]
+        if insert_before > range_start:
+            insert_before -= range_length
+        items[insert_before:insert_before] = block
+    return items
+
+
+def apply_entry(playlist_track_ids, entry):
+    """Apply a plan entry from plan_reconciliation: removals, then additions, then moves."""
+    items = list(playlist_track_ids)
+    for position, track_id in entry["remove"]:
+        assert items[position] == track_id
+        del items[position]
+    items.extend(entry["tracks"])
+    return apply_moves(items, entry["moves"])
+
+
+def shuffled_ranks(rng, size, drop=0.0, local_files=0):
+    ranks = list(range(size))
+    rng.shuffle(ranks)
+    ranks = [rank for rank in ranks if rng.random() >= drop]
+    for _ in range(local_files):
+        ranks.insert(rng.randint(0, len(ranks)), None)
+    return ranks
+
+
+def reconcile(playlist_track_ids, wanted_track_ids):
+    plan = main.new_plan({"name_template": "{season} {year}"})
+    tracks = [main.Track(track_id, track_id, i) for i, track_id in enumerate(wanted_track_ids)]
+    return main.plan_reconciliation(plan, "spring", 2024, "playlist", "snapshot", playlist_track_ids, tracks)
+
+
+@pytest.mark.parametrize("values, length", [
+    ([], 0),
+    ([3, 1, 2], 2),
+    ([0, 1, 2, 3], 4),
+    ([3, 2, 1, 0], 1),
+    ([2, 5, 3, 7, 11, 8, 10, 13, 6], 6),
+])
+def test_longest_increasing_subsequence_length(values, length):
+    result = main.longest_increasing_subsequence(values)
+    assert len(result) == length
+    kept = [value for value in values if value in result]
+    assert kept == sorted(kept)
+
+
+def test_plan_moves_sorted_playlist_needs_no_moves():
+    assert main.plan_moves(list(range(50))) == []
+    assert main.plan_moves([None, 0, None, 1, 2, None]) == []
+
+
+def test_plan_moves_moves_adjacent_items_together():
+    moves = main.plan_moves([0, 3, 4, 5, 1, 2, 6])
+    assert len(moves) == 1
+    assert apply_moves([0, 3, 4, 5, 1, 2, 6], moves) == list(range(7))
+
+
+def test_plan_moves_reversed_playlist():
+    ranks = list(range(200))[::-1]
+    moves = main.plan_moves(ranks)
+    assert len(moves) == 199
+    assert apply_moves(ranks, moves) == list(range(200))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_plan_moves_sorts_random_orders(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        ranks = shuffled_ranks(rng, rng.randint(0, 60), drop=0.2, local_files=rng.randint(0, 3))
+        moves = main.plan_moves(ranks)
+
+        result = apply_moves(ranks, moves)
+        ranked = [rank for rank in ranks if rank is not None]
+        assert [rank for rank in result if rank is not None] == sorted(ranked)
+        # Only the items off a longest increasing run move
+        assert sum(length for _, _, length in moves) <= len(ranked) - len(main.longest_increasing_subsequence(ranked))
+
+
+def test_plan_reconciliation_removes_stale_tracks_and_repeats():
+    entry = reconcile(["a", "x", "b", "a", "c"], ["a", "b", "c"])
+    assert entry["remove"] == [[3, "a"], [1, "x"]]
+    assert entry["dropped"] == ["x"]
+    assert entry["tracks"] == []
+    assert entry["moves"] == []
+
+
+def test_plan_reconciliation_leaves_local_files_alone():
+    entry = reconcile([None, "b", "a", None], ["a", "b"])
+    assert entry["remove"] == []
+    result = apply_entry([None, "b", "a", None], entry)
+    assert result[0] is None and result.count(None) == 2
+    assert [track_id for track_id in result if track_id] == ["a", "b"]
+
+
+def test_plan_reconciliation_puts_missing_tracks_in_place():
+    playlist = ["a", "b", "f", "g"]
+    wanted = ["a", "b", "c", "d", "e", "f", "g"]
+    entry = reconcile(playlist, wanted)
+    assert entry["tracks"] == ["c", "d", "e"]
+    assert apply_entry(playlist, entry) == wanted
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_plan_reconciliation_converges_in_one_run(seed):
+    rng = random.Random(seed)
+    for _ in range(20):
+        wanted = [f"t{i}" for i in range(rng.randint(0, 80))]
+        playlist = [wanted[rank] for rank in shuffled_ranks(rng, len(wanted), drop=0.3)]
+        playlist += [f"stale{i}" for i in range(rng.randint(0, 5))]
+        playlist += rng.sample(playlist, min(len(playlist), rng.randint(0, 3)))
+        rng.shuffle(playlist)
+
+        entry = reconcile(playlist, wanted)
+        assert apply_entry(playlist, entry) == wanted
+        assert reconcile(wanted, wanted)["moves"] == []
@@ -0,0 +1,84 @@
+"""Tests for combining several sources: merge_tracks and source_owners."""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+def tracks(*entries):
+    return [main.Track(track_id, "", added_at) for track_id, added_at in entries]
+
+
+def merged(*sources, newest_first=False):
+    return [(track.id, track.added_at) for track in main.merge_tracks(list(sources), newest_first=newest_first)]
+
+
+class StubMirror:
+    """Answers first_added from lists of (track ID, added_at) per source."""
+
+    def __init__(self, sources):
+        self.sources = sources
+
+    def first_added(self, key):
+        first = {}
+        for track_id, added_at in self.sources[key]:
+            first[track_id] = min(added_at, first.get(track_id, added_at))
+        return first
+
+
+def test_single_source_comes_out_unchanged():
+    source = tracks(("b", 2), ("a", 1), ("b", 3), (None, 4))
+    assert list(main.merge_tracks([source])) == source
+
+
+def test_sources_are_merged_by_added_at_then_id():
+    playlist = tracks(("a", 1), ("c", 3), ("e", 3))
+    liked = tracks(("b", 2), ("d", 3), ("f", 5))
+    assert merged(playlist, liked) == [("a", 1), ("b", 2), ("c", 3), ("d", 3), ("e", 3), ("f", 5)]
+    assert merged(liked, playlist) == merged(playlist, liked)
+
+
+def test_the_first_source_to_add_a_track_owns_it():
+    playlist = tracks(("a", 1), ("b", 4), ("a", 6))
+    liked = tracks(("b", 2), ("a", 3))
+    # "b" was liked before it was added to the playlist; repeats within the owning source are kept
+    assert merged(playlist, liked) == [("a", 1), ("b", 2), ("a", 6)]
+    # Newest first, the source that added a track last owns it
+    assert merged(playlist[::-1], liked[::-1], newest_first=True) == [("a", 6), ("b", 4), ("a", 1)]
+
+
+def test_local_files_are_never_deduplicated():
+    assert merged(tracks((None, 1), ("a", 2)), tracks((None, 1))) == [(None, 1), (None, 1), ("a", 2)]
+
+
+def test_source_owners_picks_the_earliest_add():
+    mirror = StubMirror({
+        "main": [("a", 1), ("b", 4), ("a", 6)],
+        "liked:user": [("b", 2), ("a", 3), ("c", 5)]
+    })
+    assert main.source_owners(mirror, ["main", "liked:user"]) == {"a": "main", "b": "liked:user", "c": "liked:user"}
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_merge_tracks_agrees_with_source_owners(seed):
+    rng = random.Random(seed)
+    sources = {
+        key: sorted(((f"t{rng.randint(0, 40)}", rng.randint(0, 1000)) for _ in range(rng.randint(0, 60))),
+                    key=lambda entry: (entry[1], entry[0]))
+        for key in ["main", "other", "liked:user"]
+    }
+    owners = main.source_owners(StubMirror(sources), list(sources))
+    kept = merged(*(tracks(*entries) for entries in sources.values()))
+    assert kept == sorted(kept, key=lambda entry: (entry[1], entry[0]))
+    # Everything a track's owner has of it is kept, and nothing from the other sources
+    wanted = sorted(
+        ((track_id, added_at) for key, entries in sources.items() for track_id, added_at in entries
+         if owners[track_id] == key),
+        key=lambda entry: (entry[1], entry[0])
+    )
+    assert kept == wanted